@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 
@@ -9,6 +11,122 @@ class Settings(BaseSettings):
     SPOONACULAR_API_KEY: str
     GEMINI_API_KEY: str
 
+    # Gemini client (see services/llm_client.py)
+    GEMINI_MODEL: str = "gemini-flash-latest"
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TIMEOUT_SECONDS: float = 60.0
+
+    # Shared outbound HTTP clients (services/http_clients.py)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+
+    # Upstream rate limits (requests per minute, burst); <= 0 disables a limit
+    RATE_LIMIT_GEMINI_PER_MINUTE: float = 300
+    RATE_LIMIT_GEMINI_BURST: int = 10
+    RATE_LIMIT_SPOONACULAR_PER_MINUTE: float = 60
+    RATE_LIMIT_SPOONACULAR_BURST: int = 2
+    RATE_LIMIT_OPENAI_PER_MINUTE: float = 50
+    RATE_LIMIT_OPENAI_BURST: int = 5
+    RATE_LIMIT_OPEN_FOOD_FACTS_PER_MINUTE: float = 100
+    RATE_LIMIT_OPEN_FOOD_FACTS_BURST: int = 5
+
+    # Barcode lookups (services/barcode.py): how long an unknown barcode stays unknown
+    BARCODE_NEGATIVE_TTL_SECONDS: float = 24 * 60 * 60
+    BARCODE_NEGATIVE_CACHE_MAX_ENTRIES: int = 10000
+    BARCODE_BATCH_CONCURRENCY: int = 8  # concurrent lookups per /scan/batch request
+    BARCODE_BATCH_DEADLINE_SECONDS: float = 20.0  # lookups still queued after this are reported as pending
+
+    # Persistent recipe image cache (SQLite file, keyed by normalized recipe name)
+    IMAGE_CACHE_PATH: str = "image_cache.db"
+    IMAGE_CACHE_MAX_ENTRIES: int = 20000
+    IMAGE_CACHE_OPENAI_TTL_SECONDS: float = 50 * 60  # DALL-E URLs expire after an hour
+    IMAGE_CACHE_SPOONACULAR_TTL_SECONDS: float = 30 * 24 * 60 * 60
+    IMAGE_CACHE_NEGATIVE_TTL_SECONDS: float = 15 * 60  # placeholder-only results
+    IMAGE_CACHE_LOCAL_TTL_SECONDS: float = 365 * 24 * 60 * 60  # mirrored into the image store
+
+    # Image provider race (recipe_image_service.find_recipe_image): providers run in parallel.
+    # "preferred" returns the best-ranked provider that answers within the budget,
+    # "fastest" the first one that answers at all.
+    IMAGE_PROVIDER_ORDER: List[str] = ["openai", "spoonacular"]
+    IMAGE_PROVIDER_POLICY: str = "preferred"
+    IMAGE_PROVIDER_BUDGET_SECONDS: float = 20.0
+
+    # Local mirror of recipe images, served from /static/recipe-images
+    IMAGE_STORE_ENABLED: bool = True
+    IMAGE_STORE_DIR: str = "recipe_images"
+    # Public base of this API, e.g. "https://api.example.com". Required for mirroring:
+    # clients need absolute image URLs, so while it is empty the upstream URLs are kept
+    IMAGE_STORE_BASE_URL: str = ""
+    IMAGE_STORE_MAX_BYTES: int = 10 * 1024 * 1024
+    IMAGE_STORE_DOWNLOAD_TIMEOUT_SECONDS: float = 10.0
+
+    # Thumbnails of mirrored images (needs Pillow), encoded in a process pool
+    IMAGE_THUMBNAILS_ENABLED: bool = True
+    IMAGE_THUMBNAIL_WIDTHS: List[int] = [160, 320, 640]
+    IMAGE_THUMBNAIL_FORMAT: str = "webp"  # "webp" or "jpeg"
+    IMAGE_THUMBNAIL_QUALITY: int = 80
+    IMAGE_THUMBNAIL_WORKERS: int = 2
+
+    # Max concurrent recipe image generations (DALL-E / Spoonacular)
+    RECIPE_IMAGE_CONCURRENCY: int = 4
+
+    # Deferred images: suggestions return with a placeholder + image_job_id, images follow
+    # from background workers (services/image_jobs.py), polled via /api/recipe/images.
+    # Off until the clients poll for the real image
+    RECIPE_DEFER_IMAGES: bool = False
+    IMAGE_JOB_WORKERS: int = 4
+    IMAGE_JOB_TTL_SECONDS: float = 60 * 60
+    IMAGE_JOB_MAX_JOBS: int = 10000  # also the cap on unfinished jobs
+
+    # Speculative generation: run several Gemini calls at once instead of serial retries
+    RECIPE_SPECULATIVE_GENERATION: bool = False
+    RECIPE_SPECULATIVE_FANOUT: int = 3
+    # Check ingredients while recipes stream: drop a recipe at its first forbidden ingredient, and
+    # abort the call (re-issued with that ingredient forbidden) once no later recipe in it can help
+    RECIPE_EARLY_REJECT: bool = True
+    # Swap pool: each Gemini call also asks for this many extra recipes, and once `count` are
+    # delivered the call in flight is read for up to RECIPE_POOL_FILL_SECONDS to collect them
+    RECIPE_POOL_EXTRAS: int = 3
+    RECIPE_POOL_FILL_SECONDS: float = 10.0
+    # Top up from the local recipe corpus when Gemini returns too few recipes (slow, down, or failing)
+    RECIPE_CORPUS_FALLBACK: bool = True
+    # Wall-clock budget for live generation (all attempts and images); once spent, generation is
+    # cancelled and the missing recipes come from the corpus. 0 = wait for every attempt
+    RECIPE_GENERATION_BUDGET_SECONDS: float = 30.0
+
+    # Suggestion cache (keyed on inventory + allergens + count)
+    SUGGESTION_CACHE_TTL_SECONDS: int = 3 * 60 * 60
+    SUGGESTION_CACHE_MAX_ENTRIES: int = 1000
+
+    # Persisted suggestion store + off-peak precompute job
+    SUGGESTION_STORE_MAX_AGE_HOURS: float = 24.0
+    SUGGESTION_PRECOMPUTE_ENABLED: bool = True
+    SUGGESTION_PRECOMPUTE_HOUR: int = 4  # local server time
+    SUGGESTION_PRECOMPUTE_MINUTE: int = 0
+    SUGGESTION_PRECOMPUTE_COUNT: int = 4
+    SUGGESTION_PRECOMPUTE_CONCURRENCY: int = 4
+    SUGGESTION_PRECOMPUTE_RATE_PER_SECOND: float = 1.0  # users started per second, across the job
+
+    # 5 PM dinner notification fan-out
+    NOTIFICATION_ENABLED: bool = True
+    NOTIFICATION_HOUR: int = 17  # local server time
+    NOTIFICATION_MINUTE: int = 0
+    NOTIFICATION_MISFIRE_GRACE_SECONDS: int = 60 * 60  # still run if the server was down at 5 PM
+    NOTIFICATION_BATCH_SIZE: int = 200
+    NOTIFICATION_CONCURRENCY: int = 8
+    NOTIFICATION_RATE_PER_SECOND: float = 5.0  # users started per second, across the job
+    NOTIFICATION_MAX_ATTEMPTS: int = 3  # per user, across resumed runs
+    NOTIFICATION_RETRY_DELAY_SECONDS: float = 60.0  # between passes over failed users
+    # Users are claimed a batch at a time; a claim older than this is assumed dead and re-claimed
+    NOTIFICATION_CLAIM_LEASE_SECONDS: float = 10 * 60
+    # Split users across workers: each one runs the job with its own index (user_id % count).
+    # Workers sharing an index are safe too (claims keep them apart), they just split the same users.
+    NOTIFICATION_SHARD_COUNT: int = 1
+    NOTIFICATION_SHARD_INDEX: int = 0
+
     class Config:
         env_file = ".env"
         extra = "ignore"  # Ignore extra fields in .env
@@ -0,0 +1,173 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, and_, or_
+from typing import Optional, List
+from datetime import datetime, timedelta
+import uuid
+
+from ..models.notification import NotificationJob, NotificationJobUser
+
+
+# ===== NOTIFICATION JOB CRUD =====
+
+def get_job(db: Session, run_key: str) -> Optional[NotificationJob]:
+    return db.query(NotificationJob).filter(NotificationJob.run_key == run_key).first()
+
+
+def get_or_create_job(db: Session, run_key: str) -> NotificationJob:
+    """Get the job for a run key, creating it if this is the first run (safe across workers)"""
+    job = get_job(db, run_key)
+    if job:
+        return job
+
+    job = NotificationJob(run_key=run_key, status="running")
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker created it first
+        db.rollback()
+        return get_job(db, run_key)
+    db.refresh(job)
+    return job
+
+
+def enqueue_job_users(db: Session, job: NotificationJob, user_ids: List[int], shard_count: int) -> int:
+    """Add a pending row for every user not yet in the job; returns rows added"""
+    existing = {
+        user_id for (user_id,) in
+        db.query(NotificationJobUser.user_id).filter(NotificationJobUser.job_id == job.id)
+    }
+    new_rows = [
+        NotificationJobUser(job_id=job.id, user_id=user_id, shard=user_id % shard_count, status="pending")
+        for user_id in user_ids
+        if user_id not in existing
+    ]
+    if new_rows:
+        db.add_all(new_rows)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent worker enqueued (some of) them; its rows are just as good
+            db.rollback()
+            return 0
+
+    job.total_users = db.query(NotificationJobUser).filter(NotificationJobUser.job_id == job.id).count()
+    db.commit()
+    return len(new_rows)
+
+
+def count_unsent_users(db: Session, job_id: int, shard: int, max_attempts: int) -> int:
+    """Users in this shard not yet notified that still have attempts left (including ones in flight)"""
+    return db.query(NotificationJobUser).filter(
+        NotificationJobUser.job_id == job_id,
+        NotificationJobUser.shard == shard,
+        NotificationJobUser.status != "sent",
+        NotificationJobUser.attempts < max_attempts
+    ).count()
+
+
+def claim_pending_users(
+    db: Session,
+    job_id: int,
+    shard: int,
+    max_attempts: int,
+    limit: int,
+    lease_seconds: float,
+    claimed_before: datetime
+) -> List[int]:
+    """
+    Claim up to `limit` users in this shard for notifying; returns the claimed user ids.
+    Claimable: never tried, failed before `claimed_before` (one retry per pass), or
+    "running" under a lease older than lease_seconds (its scheduler died mid-send).
+    The claim is a conditional UPDATE, so concurrent schedulers never get the same user.
+    """
+    now = datetime.now()
+    claimable = and_(
+        NotificationJobUser.job_id == job_id,
+        NotificationJobUser.shard == shard,
+        NotificationJobUser.attempts < max_attempts,
+        or_(
+            NotificationJobUser.status == "pending",
+            and_(NotificationJobUser.status == "failed", NotificationJobUser.claimed_at < claimed_before),
+            and_(NotificationJobUser.status == "running",
+                 NotificationJobUser.claimed_at < now - timedelta(seconds=lease_seconds))
+        )
+    )
+    row_ids = [
+        row_id for (row_id,) in
+        db.query(NotificationJobUser.id).filter(claimable).order_by(NotificationJobUser.user_id).limit(limit)
+    ]
+    if not row_ids:
+        return []
+
+    # Rows another scheduler claimed since the SELECT no longer match `claimable` and are skipped
+    token = uuid.uuid4().hex
+    db.query(NotificationJobUser).filter(NotificationJobUser.id.in_(row_ids), claimable).update(
+        {
+            NotificationJobUser.status: "running",
+            NotificationJobUser.claimed_at: now,
+            NotificationJobUser.claim_token: token,
+        },
+        synchronize_session=False
+    )
+    db.commit()
+
+    rows = db.query(NotificationJobUser.user_id).filter(
+        NotificationJobUser.claim_token == token
+    ).order_by(NotificationJobUser.user_id).all()
+    return [user_id for (user_id,) in rows]
+
+
+def record_job_user_result(
+    db: Session,
+    job_id: int,
+    user_id: int,
+    sent: bool,
+    latency_ms: float,
+    recipe_id: Optional[str] = None,
+    error: Optional[str] = None
+) -> None:
+    """Store one user's outcome (committed immediately so a crash loses at most in-flight users)"""
+    row = db.query(NotificationJobUser).filter(
+        NotificationJobUser.job_id == job_id,
+        NotificationJobUser.user_id == user_id
+    ).first()
+    if not row:
+        return
+
+    row.status = "sent" if sent else "failed"
+    row.attempts += 1
+    row.latency_ms = latency_ms
+    row.recipe_id = recipe_id
+    row.error = error[:500] if error else None
+    db.commit()
+
+
+def finish_job(db: Session, job_id: int, max_attempts: int) -> Optional[NotificationJob]:
+    """Refresh the job's counters; mark it completed once no user has attempts left"""
+    job = db.query(NotificationJob).filter(NotificationJob.id == job_id).first()
+    if not job:
+        return None
+
+    counts = dict(
+        db.query(NotificationJobUser.status, func.count(NotificationJobUser.id))
+        .filter(NotificationJobUser.job_id == job_id)
+        .group_by(NotificationJobUser.status)
+        .all()
+    )
+    job.sent = counts.get("sent", 0)
+    job.failed = counts.get("failed", 0)
+
+    retriable = db.query(NotificationJobUser).filter(
+        NotificationJobUser.job_id == job_id,
+        NotificationJobUser.status != "sent",
+        NotificationJobUser.attempts < max_attempts
+    ).count()
+    if retriable == 0:
+        job.status = "completed"
+        job.finished_at = datetime.now()
+
+    db.commit()
+    db.refresh(job)
+    return job
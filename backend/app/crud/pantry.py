@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import Optional, List
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, List, Dict, Iterable
 from datetime import datetime
 from fastapi import HTTPException
 
@@ -11,6 +12,7 @@ from ..schemas.pantry import (
     UserPreferencesCreate, UserPreferencesUpdate,
     DinnerHistoryCreate, DinnerHistoryUpdate
 )
+from ..services.suggestion_cache import suggestion_cache
 
 
 # ===== PANTRY ITEM CRUD =====
@@ -30,6 +32,54 @@ def create_pantry_item(db: Session, item: PantryItemCreate) -> PantryItem:
     return db_item
 
 
+def get_or_create_pantry_item_by_barcode(db: Session, item: PantryItemCreate) -> PantryItem:
+    """
+    Create an item for a scanned barcode, or return the existing one if another request
+    added the same barcode first (the unique index decides the race)
+    """
+    try:
+        return create_pantry_item(db, item)
+    except HTTPException:
+        # Already existed when we checked
+        return get_pantry_item_by_barcode(db, item.barcode)
+    except IntegrityError:
+        # Inserted concurrently between the check and our commit
+        db.rollback()
+        return get_pantry_item_by_barcode(db, item.barcode)
+
+
+def get_pantry_items_by_barcodes(db: Session, barcodes: Iterable[str]) -> Dict[str, PantryItem]:
+    """barcode -> item for every barcode we already have, in one IN (...) query"""
+    barcodes = list(set(barcodes))
+    if not barcodes:
+        return {}
+    items = db.query(PantryItem).filter(PantryItem.barcode.in_(barcodes)).all()
+    return {item.barcode: item for item in items}
+
+
+def create_pantry_items_by_barcode(db: Session, items: List[PantryItemCreate]) -> Dict[str, PantryItem]:
+    """
+    Insert new barcoded items in one transaction; returns barcode -> item for all of them.
+    Barcodes another request inserted concurrently are left as that request created them.
+    """
+    barcodes = [item.barcode for item in items]
+    for _ in range(2):
+        existing = get_pantry_items_by_barcodes(db, barcodes)
+        new_rows = [item.model_dump() for item in items if item.barcode not in existing]
+        if not new_rows:
+            return existing
+        try:
+            # executemany: one INSERT statement for the whole batch
+            db.execute(insert(PantryItem), new_rows)
+            db.commit()
+            break
+        except IntegrityError:
+            # Lost a race on one of the barcodes: re-check and insert the rest
+            db.rollback()
+    # One query for the lot instead of refreshing row by row
+    return get_pantry_items_by_barcodes(db, barcodes)
+
+
 def get_pantry_item(db: Session, item_id: int) -> Optional[PantryItem]:
     """Get pantry item by ID"""
     return db.query(PantryItem).filter(PantryItem.id == item_id).first()
@@ -81,6 +131,8 @@ def update_pantry_item(
     
     db.commit()
     db.refresh(db_item)
+    # Renames affect every inventory that holds this item
+    suggestion_cache.clear()
     return db_item
 
 
@@ -92,6 +144,7 @@ def delete_pantry_item(db: Session, item_id: int) -> bool:
     
     db.delete(db_item)
     db.commit()
+    suggestion_cache.clear()
     return True
 
 
@@ -115,6 +168,13 @@ def get_user_inventory(
     return q.all()
 
 
+def get_all_user_ids(db: Session) -> List[int]:
+    """Distinct user ids that have an inventory or preferences (there is no users table yet)"""
+    inventory_users = {row[0] for row in db.query(Inventory.user_id).distinct()}
+    preference_users = {row[0] for row in db.query(UserPreferences.user_id).distinct()}
+    return sorted(inventory_users | preference_users)
+
+
 def get_inventory_item(db: Session, inventory_id: int, user_id: int) -> Optional[Inventory]:
     """Get specific inventory item"""
     return db.query(Inventory).filter(
@@ -147,6 +207,7 @@ def create_inventory_item(
         _check_low_stock(existing)
         db.commit()
         db.refresh(existing)
+        suggestion_cache.invalidate_user(user_id)
         return existing
     
     # Create new inventory entry
@@ -159,6 +220,7 @@ def create_inventory_item(
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
+    suggestion_cache.invalidate_user(user_id)
     return db_item
 
 
@@ -181,6 +243,7 @@ def update_inventory_item(
     
     db.commit()
     db.refresh(db_item)
+    suggestion_cache.invalidate_user(user_id)
     return db_item
 
 
@@ -206,6 +269,7 @@ def adjust_inventory_quantity(
     
     db.commit()
     db.refresh(db_item)
+    suggestion_cache.invalidate_user(user_id)
     return db_item
 
 
@@ -217,6 +281,7 @@ def delete_inventory_item(db: Session, inventory_id: int, user_id: int) -> bool:
     
     db.delete(db_item)
     db.commit()
+    suggestion_cache.invalidate_user(user_id)
     return True
 
 
@@ -264,6 +329,7 @@ def create_user_preferences(
     db.add(db_prefs)
     db.commit()
     db.refresh(db_prefs)
+    suggestion_cache.invalidate_user(user_id)
     return db_prefs
 
 
@@ -291,6 +357,7 @@ def update_user_preferences(
     
     db.commit()
     db.refresh(db_prefs)
+    suggestion_cache.invalidate_user(user_id)
     return db_prefs
 
 
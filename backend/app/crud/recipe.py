@@ -0,0 +1,193 @@
+from sqlalchemy.orm import Session
+from typing import Optional, List, Dict
+from datetime import datetime, timedelta
+
+from ..models.recipe import StoredSuggestion, StoredRecipe
+
+
+# ===== STORED SUGGESTIONS CRUD =====
+
+def get_stored_suggestions(
+    db: Session,
+    user_id: int,
+    inventory_version: str,
+    max_age_hours: Optional[float] = None
+) -> Optional[StoredSuggestion]:
+    """Get stored suggestions for a user's current inventory version (optionally only fresh ones)"""
+    q = db.query(StoredSuggestion).filter(
+        StoredSuggestion.user_id == user_id,
+        StoredSuggestion.inventory_version == inventory_version
+    )
+
+    if max_age_hours is not None:
+        cutoff = datetime.now() - timedelta(hours=max_age_hours)
+        q = q.filter(StoredSuggestion.created_at >= cutoff)
+
+    return q.first()
+
+
+def save_stored_suggestions(
+    db: Session,
+    user_id: int,
+    inventory_version: str,
+    recipes: List[Dict],
+    source: str = "live"
+) -> StoredSuggestion:
+    """
+    Insert or replace the suggestions for (user, inventory version).
+    A shorter list never replaces a longer one from the same version, so a
+    count=1 request can't shrink a precomputed batch.
+    """
+    existing = db.query(StoredSuggestion).filter(
+        StoredSuggestion.user_id == user_id,
+        StoredSuggestion.inventory_version == inventory_version
+    ).first()
+
+    if existing:
+        if len(recipes) < existing.recipe_count:
+            return existing
+        existing.recipes = recipes
+        existing.recipe_count = len(recipes)
+        existing.source = source
+        existing.created_at = datetime.now()
+        db.commit()
+        db.refresh(existing)
+        return existing
+
+    db_suggestion = StoredSuggestion(
+        user_id=user_id,
+        inventory_version=inventory_version,
+        recipes=recipes,
+        recipe_count=len(recipes),
+        source=source,
+        # Set explicitly so freshness checks compare like with like (server now() is UTC on SQLite)
+        created_at=datetime.now()
+    )
+    db.add(db_suggestion)
+    db.commit()
+    db.refresh(db_suggestion)
+    return db_suggestion
+
+
+def delete_stale_suggestions(db: Session, older_than_hours: float) -> int:
+    """Remove stored suggestions older than the cutoff; returns rows deleted"""
+    cutoff = datetime.now() - timedelta(hours=older_than_hours)
+    deleted = db.query(StoredSuggestion).filter(StoredSuggestion.created_at < cutoff).delete()
+    db.commit()
+    return deleted
+
+
+# ===== STORED RECIPES (SWAP POOL) CRUD =====
+
+def save_recipe_pool(
+    db: Session,
+    user_id: int,
+    inventory_version: str,
+    shown: List[Dict],
+    extras: List[Dict]
+) -> int:
+    """
+    Store generated recipes for (user, inventory version) in one transaction.
+    `shown` were already served to the user (stored as seen), `extras` become swap alternatives.
+    Pools for the user's older inventory versions are dropped. Returns rows added.
+    """
+    db.query(StoredRecipe).filter(
+        StoredRecipe.user_id == user_id,
+        StoredRecipe.inventory_version != inventory_version
+    ).delete(synchronize_session=False)
+
+    rows = [
+        _stored_recipe_from_dict(user_id, inventory_version, recipe, seen=seen)
+        for recipes, seen in ((shown, True), (extras, False))
+        for recipe in recipes
+    ]
+    db.add_all(rows)
+    db.commit()
+    return len(rows)
+
+
+def take_next_unseen_recipe(db: Session, user_id: int, inventory_version: str) -> Optional[StoredRecipe]:
+    """Oldest unseen recipe in the user's pool for this inventory version, marked as seen"""
+    stored = db.query(StoredRecipe).filter(
+        StoredRecipe.user_id == user_id,
+        StoredRecipe.inventory_version == inventory_version,
+        StoredRecipe.seen == False  # noqa: E712
+    ).order_by(StoredRecipe.id).first()
+
+    if stored:
+        stored.seen = True
+        db.commit()
+        db.refresh(stored)
+    return stored
+
+
+def mark_recipe_seen(db: Session, user_id: int, recipe_id: str) -> None:
+    """Mark a recipe the user has been shown (e.g. the one being swapped away) as seen"""
+    db.query(StoredRecipe).filter(
+        StoredRecipe.user_id == user_id,
+        StoredRecipe.recipe_id == recipe_id
+    ).update({StoredRecipe.seen: True}, synchronize_session=False)
+    db.commit()
+
+
+def update_stored_recipe_image(db: Session, stored: StoredRecipe, image_url: Optional[str]) -> None:
+    stored.image_url = image_url
+    db.commit()
+
+
+def set_stored_recipe_image(db: Session, stored_id: int, image_url: str) -> None:
+    """Fill in the image of a pooled recipe by id (deferred images finish after the request)"""
+    stored = db.get(StoredRecipe, stored_id)
+    if stored is not None and not stored.image_url:
+        update_stored_recipe_image(db, stored, image_url)
+
+
+def get_pool_recipe_names(db: Session, user_id: int, inventory_version: str) -> List[str]:
+    """Names of every pooled recipe for this inventory version (seen or not)"""
+    rows = db.query(StoredRecipe.name).filter(
+        StoredRecipe.user_id == user_id,
+        StoredRecipe.inventory_version == inventory_version
+    ).all()
+    return [name for (name,) in rows]
+
+
+def stored_recipe_to_dict(stored: StoredRecipe) -> Dict:
+    """Stored row back to the recipe dict shape used by the recipe service (RecipeResponse)"""
+    return {
+        "recipe_id": stored.recipe_id,
+        "name": stored.name,
+        "servings": stored.servings,
+        "ready_in_minutes": stored.ready_in_minutes,
+        "image_url": stored.image_url,
+        "image_search_keywords": stored.image_search_keywords,
+        "calories_per_serving": stored.calories_per_serving,
+        "protein_per_serving": stored.protein_per_serving,
+        "carbs_per_serving": stored.carbs_per_serving,
+        "fat_per_serving": stored.fat_per_serving,
+        "ingredients": stored.ingredients,
+        "steps": stored.steps,
+        "source": stored.source,
+        "spoonacular_url": stored.spoonacular_url,
+    }
+
+
+def _stored_recipe_from_dict(user_id: int, inventory_version: str, recipe: Dict, seen: bool) -> StoredRecipe:
+    return StoredRecipe(
+        recipe_id=str(recipe.get("recipe_id")),
+        user_id=user_id,
+        inventory_version=inventory_version,
+        name=recipe.get("name"),
+        servings=recipe.get("servings") or 1,
+        ready_in_minutes=recipe.get("ready_in_minutes") or 0,
+        image_url=recipe.get("image_url"),
+        image_search_keywords=recipe.get("image_search_keywords"),
+        calories_per_serving=recipe.get("calories_per_serving") or 0,
+        protein_per_serving=recipe.get("protein_per_serving") or 0,
+        carbs_per_serving=recipe.get("carbs_per_serving") or 0,
+        fat_per_serving=recipe.get("fat_per_serving") or 0,
+        ingredients=recipe.get("ingredients") or [],
+        steps=recipe.get("steps") or [],
+        source=recipe.get("source") or "gemini_ai",
+        spoonacular_url=recipe.get("spoonacular_url"),
+        seen=seen
+    )
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from .db import get_db
+from .services.http_clients import get_http_client
 
 # Placeholder for auth - implement proper JWT auth for production
 def get_current_user():
@@ -8,4 +9,4 @@ def get_current_user():
     return {"id": 1, "email": "test@example.com"}
 
 # Export get_db for routes to use
-__all__ = ["get_db", "get_current_user"]
+__all__ = ["get_db", "get_current_user", "get_http_client"]
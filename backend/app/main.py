@@ -1,9 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import pantry, recipe
+from .db import Base, engine
+from .models import pantry as pantry_models, recipe as recipe_models, notification as notification_models  # noqa: F401 (register tables)
+from .routes import pantry, recipe, images
+from .services.llm_client import llm_client
+from .services.rate_limiter import rate_limiter
+from .services.http_clients import http_clients
+from .services.image_cache import image_cache
+from .services.image_store import image_store
+from .services.image_jobs import image_jobs
+from .services.recipe_image_service import provider_stats
+from .services.barcode import barcode_service
+from .services.recipe_service import recipe_service
+from .services.scheduler import start_scheduler, shutdown_scheduler
 # from .routes import dinner  # Your teammate's routes
 
-app = FastAPI(title="What's For Dinner API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create any tables added since the database was seeded
+    Base.metadata.create_all(bind=engine)
+    http_clients.start()
+    start_scheduler()
+    yield
+    shutdown_scheduler()
+    await image_jobs.close()
+    await http_clients.close()
+    image_store.close()
+
+
+app = FastAPI(title="What's For Dinner API", lifespan=lifespan)
 
 # CORS for iOS app
 app.add_middleware(
@@ -17,6 +44,7 @@ app.add_middleware(
 # Include routers
 app.include_router(pantry.router)
 app.include_router(recipe.router)  # Your teammate's routes
+app.include_router(images.router)
 
 @app.get("/")
 def root():
@@ -25,3 +53,18 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+def metrics():
+    """Runtime stats for outbound integrations"""
+    return {
+        "llm": llm_client.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "http": http_clients.stats(),
+        "image_cache": image_cache.stats(),
+        "image_store": image_store.stats(),
+        "image_jobs": image_jobs.stats(),
+        "image_providers": provider_stats.stats(),
+        "barcode": barcode_service.stats(),
+        "suggestion_single_flight": recipe_service.suggestion_flight_stats(),
+    }
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from ..db import Base
+
+
+class NotificationJob(Base):
+    """
+    One run of a notification fan-out (e.g. the 5 PM dinner push for one day).
+    run_key is unique, so a restarted job picks up the same row and resumes.
+    """
+    __tablename__ = "notification_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_key = Column(String, nullable=False, unique=True)  # e.g. "daily_dinner:2026-10-17"
+    status = Column(String, nullable=False, default="running")  # "running" or "completed"
+
+    total_users = Column(Integer, nullable=False, default=0)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class NotificationJobUser(Base):
+    """Per-user outcome of a notification job"""
+    __tablename__ = "notification_job_users"
+    __table_args__ = (
+        UniqueConstraint("job_id", "user_id", name="uq_notification_job_users_job_user"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("notification_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    shard = Column(Integer, nullable=False, default=0)
+
+    status = Column(String, nullable=False, default="pending")  # "pending", "running", "sent" or "failed"
+    attempts = Column(Integer, nullable=False, default=0)
+    # Set when a scheduler claims the row; a "running" row with an old claimed_at is an expired lease
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    claim_token = Column(String, nullable=True, index=True)
+    latency_ms = Column(Float, nullable=True)
+    recipe_id = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,107 @@
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, JSON, Index, UniqueConstraint, ForeignKey
+from sqlalchemy.sql import func
+from ..db import Base
+
+
+class StoredSuggestion(Base):
+    """
+    Precomputed (or previously generated) recipe suggestions for a user.
+    Keyed by inventory version - a fingerprint of the user's available
+    ingredients and allergens - so a pantry change naturally misses.
+    """
+    __tablename__ = "stored_suggestions"
+    __table_args__ = (
+        UniqueConstraint("user_id", "inventory_version", name="uq_stored_suggestions_user_version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    inventory_version = Column(String(64), nullable=False)
+
+    # List of recipe dicts in RecipeResponse shape
+    recipes = Column(JSON, nullable=False)
+    recipe_count = Column(Integer, nullable=False, default=0)
+    source = Column(String, nullable=False, default="live")  # "precompute" or "live"
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class StoredRecipe(Base):
+    """
+    Every valid generated recipe (including extras beyond the requested count),
+    kept as a pool of alternatives so /swap doesn't need a Gemini call.
+    `seen` flips once the recipe has been shown to the user.
+    """
+    __tablename__ = "stored_recipes"
+    __table_args__ = (
+        # Serves "next unseen recipe for this user + inventory version" straight from the index
+        Index("ix_stored_recipes_pool", "user_id", "inventory_version", "seen", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipe_id = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False)
+    inventory_version = Column(String(64), nullable=False)
+
+    name = Column(String, nullable=False)
+    servings = Column(Integer, nullable=False, default=1)
+    ready_in_minutes = Column(Integer, nullable=False, default=0)
+    image_url = Column(String, nullable=True)  # Extras are stored without one; generated on first serve
+    image_search_keywords = Column(String, nullable=True)
+
+    # Macros (per serving)
+    calories_per_serving = Column(Float, nullable=False, default=0)
+    protein_per_serving = Column(Float, nullable=False, default=0)
+    carbs_per_serving = Column(Float, nullable=False, default=0)
+    fat_per_serving = Column(Float, nullable=False, default=0)
+
+    ingredients = Column(JSON, nullable=False)
+    steps = Column(JSON, nullable=False)
+
+    source = Column(String, nullable=False, default="gemini_ai")
+    spoonacular_url = Column(String, nullable=True)
+
+    seen = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CorpusRecipe(Base):
+    """
+    Local recipe corpus (imported from a JSONL dump, see import_recipe_corpus.py).
+    Queried for /too-tired and as the fallback when Gemini is slow or down.
+    """
+    __tablename__ = "corpus_recipes"
+    __table_args__ = (
+        Index("ix_corpus_recipes_effort", "ready_in_minutes", "ingredient_count"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    external_id = Column(String, nullable=False, unique=True)
+    name = Column(String, nullable=False)
+    servings = Column(Integer, nullable=False, default=1)
+    ready_in_minutes = Column(Integer, nullable=False)
+    # Distinct canonical ingredients (rows in corpus_recipe_ingredients)
+    ingredient_count = Column(Integer, nullable=False)
+
+    # Macros (per serving)
+    calories_per_serving = Column(Float, nullable=False, default=0)
+    protein_per_serving = Column(Float, nullable=False, default=0)
+    carbs_per_serving = Column(Float, nullable=False, default=0)
+    fat_per_serving = Column(Float, nullable=False, default=0)
+
+    ingredients = Column(JSON, nullable=False)
+    steps = Column(JSON, nullable=False)
+    # Comma-wrapped DietaryRestriction values the recipe satisfies, e.g. ",vegetarian,nut_free,"
+    diets = Column(String, nullable=False, default=",")
+
+    image_url = Column(String, nullable=True)
+    source_url = Column(String, nullable=True)
+
+
+class CorpusRecipeIngredient(Base):
+    """Inverted index: canonical ingredient -> corpus recipes that need it"""
+    __tablename__ = "corpus_recipe_ingredients"
+
+    ingredient = Column(String, primary_key=True)
+    recipe_id = Column(Integer, ForeignKey("corpus_recipes.id", ondelete="CASCADE"), primary_key=True, index=True)
@@ -0,0 +1,35 @@
+"""
+Image Routes - Serves the locally mirrored recipe images (see services/image_store.py)
+
+Files are content-addressed, so the hash in the name is a strong ETag and the
+response can be cached forever by clients and CDNs.
+"""
+
+import os
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+
+from ..services.image_store import image_store, IMAGE_ROUTE_PREFIX
+
+router = APIRouter(prefix=IMAGE_ROUTE_PREFIX, tags=["images"])
+
+# Content never changes for a given name
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/{filename}")
+def get_recipe_image(filename: str, request: Request):
+    """Serve a mirrored recipe image, answering 304 when the client already has it."""
+    path = image_store.path_for(filename)
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+
+    etag = f'"{filename.rsplit(".", 1)[0]}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(path, headers=headers)
@@ -1,4 +1,8 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -8,11 +12,14 @@ from ..schemas.pantry import (
     UserPreferencesCreate, UserPreferencesUpdate, UserPreferencesResponse,
     DinnerHistoryCreate, DinnerHistoryUpdate, DinnerHistoryResponse,
     BarcodeScanRequest, BarcodeScanResponse,
+    BarcodeBatchScanRequest, BarcodeBatchScanResponse, BarcodeBatchScanResult,
     InventoryBatchAdd, InventoryBatchResponse,
     MacroSummary, Category
 )
 from ..models.pantry import UnitType
+from ..config import settings
 from ..crud import pantry as crud
+from ..services.barcode import barcode_service
 
 from ..deps import get_db, get_current_user
 
@@ -86,15 +93,18 @@ def delete_item(
 # ===== BARCODE SCANNING =====
 
 @router.post("/scan", response_model=BarcodeScanResponse)
-def scan_barcode(
+async def scan_barcode(
         scan_request: BarcodeScanRequest,
         db: Session = Depends(get_db)
 ):
     """
     Scan a barcode and return the pantry item if found.
+    Barcodes we don't have yet are looked up in Open Food Facts and saved as new pantry items.
     If not found, frontend can prompt user to manually enter item details.
     """
-    item = crud.get_pantry_item_by_barcode(db, scan_request.barcode)
+    barcode = scan_request.barcode.strip()
+    # Database work runs in the threadpool: the handler is async for the network lookup
+    item = await run_in_threadpool(crud.get_pantry_item_by_barcode, db, barcode)
 
     if item:
         return BarcodeScanResponse(
@@ -102,12 +112,109 @@ def scan_barcode(
             item=PantryItemResponse.model_validate(item),
             message="Item found!"
         )
-    else:
+
+    # Not in DB, try external lookup (read-through)
+    barcode_data = await barcode_service.lookup_barcode(barcode)
+    item_create = None
+    if barcode_data:
+        try:
+            item_create = barcode_service.create_pantry_item_from_barcode(barcode_data)
+        except ValidationError as e:
+            # Product data we can't store; let the user enter it instead
+            print(f"Unusable Open Food Facts data for barcode {barcode}: {e.error_count()} invalid field(s)")
+    if item_create is not None:
+        item = await run_in_threadpool(crud.get_or_create_pantry_item_by_barcode, db, item_create)
         return BarcodeScanResponse(
-            found=False,
-            message="Item not found. Would you like to add it manually?"
+            found=True,
+            item=PantryItemResponse.model_validate(item),
+            message=f"Item found in {barcode_data['source']}!"
         )
 
+    return BarcodeScanResponse(
+        found=False,
+        message="Item not found. Would you like to add it manually?"
+    )
+
+
+@router.post("/scan/batch", response_model=BarcodeBatchScanResponse)
+async def scan_barcodes_batch(
+        batch: BarcodeBatchScanRequest,
+        db: Session = Depends(get_db)
+):
+    """
+    Scan a whole shopping trip at once.
+    Known barcodes come from a single database query; the rest are looked up in
+    Open Food Facts concurrently (capped) and saved in one transaction.
+    Products whose data we can't store are reported as not found; lookups still
+    running at the batch deadline are reported as pending so the client can rescan them.
+    """
+    barcodes = list(dict.fromkeys(barcode.strip() for barcode in batch.barcodes))
+    valid = [barcode for barcode in barcodes if 0 < len(barcode) <= 50]
+
+    # Database work runs in the threadpool: the handler is async for the network lookups
+    local = await run_in_threadpool(crud.get_pantry_items_by_barcodes, db, valid)
+    misses = [barcode for barcode in valid if barcode not in local]
+
+    semaphore = asyncio.Semaphore(max(1, settings.BARCODE_BATCH_CONCURRENCY))
+
+    async def lookup(barcode: str):
+        async with semaphore:
+            return await barcode_service.lookup_barcode(barcode)
+
+    # The Open Food Facts rate limit makes a large batch slow; don't hold the request for all of it
+    tasks = {barcode: asyncio.create_task(lookup(barcode)) for barcode in misses}
+    pending = set()
+    if tasks:
+        _, unfinished = await asyncio.wait(tasks.values(), timeout=settings.BARCODE_BATCH_DEADLINE_SECONDS)
+        for task in unfinished:
+            task.cancel()
+        pending = {barcode for barcode, task in tasks.items() if task in unfinished}
+        if pending:
+            print(f"Batch scan deadline reached: {len(pending)} of {len(misses)} lookup(s) left pending")
+
+    new_items = []
+    for barcode, task in tasks.items():
+        if barcode in pending:
+            continue
+        if task.exception() is not None:
+            print(f"Open Food Facts lookup failed for barcode {barcode}: {task.exception()}")
+            continue
+        data = task.result()
+        if not data:
+            continue
+        try:
+            new_items.append(barcode_service.create_pantry_item_from_barcode(data))
+        except ValidationError as e:
+            print(f"Unusable Open Food Facts data for barcode {barcode}: {e.error_count()} invalid field(s)")
+    created = await run_in_threadpool(crud.create_pantry_items_by_barcode, db, new_items) if new_items else {}
+
+    results = []
+    for barcode in barcodes:
+        if barcode in local:
+            item, source = local[barcode], "database"
+        elif barcode in created:
+            item, source = created[barcode], "external"
+        elif barcode in pending:
+            item, source = None, "pending"
+        else:
+            item, source = None, None
+        results.append(BarcodeBatchScanResult(
+            barcode=barcode,
+            found=item is not None,
+            item=PantryItemResponse.model_validate(item) if item else None,
+            source=source
+        ))
+
+    found_count = sum(1 for result in results if result.found)
+    pending_count = sum(1 for result in results if result.source == "pending")
+    return BarcodeBatchScanResponse(
+        found_count=found_count,
+        created_count=sum(1 for result in results if result.source == "external"),
+        not_found_count=len(results) - found_count - pending_count,
+        pending_count=pending_count,
+        results=results
+    )
+
 
 # ===== INVENTORY ENDPOINTS =====
 
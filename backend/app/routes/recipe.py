@@ -9,18 +9,29 @@ This shows how to:
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 import httpx
 
 from ..services.recipe_service import recipe_service
-from ..deps import get_current_user, get_db
+from ..services.image_jobs import image_jobs
+from ..services import recipe_corpus
+from ..deps import get_current_user, get_db, get_http_client
 from ..crud import pantry as crud
 from ..schemas.pantry import DinnerHistoryCreate
 
 router = APIRouter(prefix="/api/recipe", tags=["recipe"])
 
+# "Too Tired" constraints
+TOO_TIRED_MAX_INGREDIENTS = 3
+TOO_TIRED_MAX_MINUTES = 15
+
+# Max job ids per /images/batch poll
+IMAGE_JOB_BATCH_LIMIT = 50
+
 
 # ===== REQUEST/RESPONSE SCHEMAS =====
 
@@ -30,6 +41,10 @@ class RecipeResponse(BaseModel):
     servings: int
     ready_in_minutes: int
     image_url: Optional[str] = None
+    # Smaller copies of image_url keyed by pixel width, e.g. {"320": url}
+    image_variants: Optional[Dict[str, str]] = None
+    # Set while image_url is a placeholder: poll /api/recipe/images/{image_job_id} for the real image
+    image_job_id: Optional[str] = None
 
     # Macros
     calories_per_serving: float
@@ -48,6 +63,17 @@ class RecipeResponse(BaseModel):
     spoonacular_url: Optional[str] = None
 
 
+class ImageJobResponse(BaseModel):
+    job_id: str
+    status: str  # pending, running, done, failed
+    image_url: Optional[str] = None  # the placeholder until status is done
+    image_variants: Optional[Dict[str, str]] = None
+
+
+class ImageJobBatchRequest(BaseModel):
+    job_ids: List[str]
+
+
 class AcceptRecipeRequest(BaseModel):
     recipe_id: str
     name: str
@@ -106,6 +132,43 @@ async def get_suggestions(
     return recipes
 
 
+@router.get("/suggestions/stream")
+async def stream_suggestions(
+        count: int = RECIPE_ENGINE_COUNT,
+        allergens: Optional[str] = Query(None, description="Comma-separated: egg, milk, peanut"),
+        current_user: dict = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    """
+    Streaming variant of /suggestions (NDJSON, one RecipeResponse per line).
+    Each recipe is written as soon as it passes validation and has its image (or, with
+    deferred images, its placeholder and image_job_id), so clients can render the first
+    card without waiting for the whole batch.
+    """
+    user_id = current_user["id"]
+    # Resolve inputs now: the DB session is closed before the body is streamed
+    resolved_allergens, available_ingredients = await recipe_service.get_suggestion_inputs(
+        user_id, db, _parse_allergens(allergens)
+    )
+
+    async def ndjson_lines():
+        try:
+            async for recipe in recipe_service.iter_suggestions(
+                    user_id=user_id,
+                    allergens=resolved_allergens,
+                    available_ingredients=available_ingredients,
+                    count=min(max(1, count), 10),  # clamp 1–10, default 4
+            ):
+                try:
+                    yield RecipeResponse.model_validate(recipe).model_dump_json() + "\n"
+                except ValidationError as e:
+                    print(f"Skipping malformed recipe '{recipe.get('name')}' in stream: {e}")
+        except Exception as e:
+            print(f"Error in stream_suggestions: {e}")
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @router.get("/daily-suggestion", response_model=RecipeResponse)
 async def get_daily_suggestion(
         current_user: dict = Depends(get_current_user),
@@ -114,14 +177,14 @@ async def get_daily_suggestion(
     """
     Get tonight's dinner suggestion.
 
-    This is called at 5 PM (use a scheduler like APScheduler or Celery).
+    Suggestions are precomputed off-peak for every user (see services/scheduler.py)
+    and served from the stored_suggestions table while the inventory is unchanged.
 
     Flow:
-    1. Get user's allergens from pantry API
-    2. Get user's inventory from pantry API
-    3. Search Spoonacular for recipes
-    4. Use AI to simplify cooking steps
-    5. Return single best recipe
+    1. Get user's allergens and inventory from the pantry DB
+    2. Serve the stored suggestion for this inventory version if there is one
+    3. Otherwise generate live with Gemini (validated against inventory) and store it
+    4. Return single best recipe
     """
 
     recipe = await recipe_service.get_daily_suggestion(
@@ -165,28 +228,39 @@ async def accept_recipe(
     }
 
 
-@router.post("/swap")
+@router.post("/swap", response_model=RecipeResponse)
 async def swap_recipe(
         current_recipe_id: str,
-        current_user: dict = Depends(get_current_user)
+        current_user: dict = Depends(get_current_user),
+        db: Session = Depends(get_db)
 ):
     """
     User wants a different recipe (clicked 'Swap' button).
 
-    Get another suggestion with similar constraints.
+    Every valid recipe generated for the user is kept in the stored_recipes pool
+    (including extras beyond what was asked for), so a swap is normally one
+    indexed query: the next unseen alternative for the current inventory.
+    Only when the pool is exhausted does it generate a new one with Gemini.
     """
-    # Uncomment when recipe_service is set up:
-    # new_recipe = await recipe_service.get_daily_suggestion(
-    #     user_id=current_user["id"]
-    # )
-    # return new_recipe
+    recipe = await recipe_service.get_swap_alternative(
+        user_id=current_user["id"],
+        db=db,
+        current_recipe_id=current_recipe_id
+    )
+
+    if recipe is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Could not find an alternative recipe for your current inventory."
+        )
 
-    return {"message": "Swap feature - returns alternative recipe"}
+    return recipe
 
 
-@router.get("/too-tired")
+@router.get("/too-tired", response_model=RecipeResponse)
 async def get_ultra_easy_meal(
-        current_user: dict = Depends(get_current_user)
+        current_user: dict = Depends(get_current_user),
+        db: Session = Depends(get_db)
 ):
     """
     Emergency 'Too Tired' option - ultra-simple meals.
@@ -195,50 +269,89 @@ async def get_ultra_easy_meal(
     - Max 3 ingredients
     - Max 15 minutes
     - Minimal cooking required
+
+    Answered from the local recipe corpus (see services/recipe_corpus.py):
+    quickest recipe made only from what's in the user's inventory.
     """
-    # Search Spoonacular with stricter constraints
-    # max_ingredients=3, max_ready_time=15
+    allergens, available_ingredients = await recipe_service.get_suggestion_inputs(current_user["id"], db)
+
+    # Blocking query (and, hourly, the corpus index rebuild): keep it off the event loop
+    recipes = await run_in_threadpool(
+        recipe_corpus.find_cookable_recipes,
+        db,
+        available_ingredients,
+        dietary_restrictions=allergens,
+        max_ingredients=TOO_TIRED_MAX_INGREDIENTS,
+        max_ready_minutes=TOO_TIRED_MAX_MINUTES,
+        quickest_first=True,
+        limit=1
+    )
 
-    return {
-        "recipe_id": "emergency_123",
-        "name": "3-Ingredient Scrambled Eggs",
-        "servings": 1,
-        "ready_in_minutes": 5,
-        "ingredients": [
-            {"name": "eggs", "amount": 2, "unit": "piece"},
-            {"name": "butter", "amount": 1, "unit": "tbsp"},
-            {"name": "salt", "amount": 1, "unit": "pinch"}
-        ],
-        "steps": [
-            "Crack eggs into a bowl and whisk.",
-            "Melt butter in a pan over medium heat, add eggs.",
-            "Stir gently until just set, about 2 minutes. Season and serve!"
-        ]
-    }
+    if not recipes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No ultra-easy recipe can be made from your current inventory."
+        )
+
+    return recipes[0]
+
+
+@router.get("/images/{job_id}", response_model=ImageJobResponse)
+async def get_image_job(
+        job_id: str,
+        current_user: dict = Depends(get_current_user)
+):
+    """
+    Status of a deferred recipe image (image_job_id on a suggestion).
+    Poll until status is done or failed; image_url is then the final image.
+    """
+    job = image_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image job not found")
+    return job.to_dict()
+
+
+@router.post("/images/batch", response_model=List[ImageJobResponse])
+async def get_image_jobs(
+        request: ImageJobBatchRequest,
+        current_user: dict = Depends(get_current_user)
+):
+    """
+    Status of several deferred recipe images at once (one poll for a whole suggestions screen).
+    Unknown or expired job ids are left out of the response.
+    """
+    if len(request.job_ids) > IMAGE_JOB_BATCH_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {IMAGE_JOB_BATCH_LIMIT} job ids per request"
+        )
+    jobs = (image_jobs.get(job_id) for job_id in dict.fromkeys(request.job_ids))
+    return [job.to_dict() for job in jobs if job is not None]
 
 
 @router.get("/history")
 async def get_recipe_history(
         days: int = 30,
-        current_user: dict = Depends(get_current_user)
+        current_user: dict = Depends(get_current_user),
+        client: httpx.AsyncClient = Depends(get_http_client)
 ):
     """
     Get recipes the user has cooked recently.
 
     This calls your pantry API's dinner history endpoint.
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"http://localhost:8000/api/pantry/dinners?days={days}",
-            headers={"Authorization": f"Bearer {current_user['token']}"}
-        )
-        return response.json()
+    response = await client.get(
+        f"http://localhost:8000/api/pantry/dinners?days={days}",
+        headers={"Authorization": f"Bearer {current_user['token']}"}
+    )
+    return response.json()
 
 
 @router.get("/macros/progress")
 async def get_macro_progress(
         days: int = 7,
-        current_user: dict = Depends(get_current_user)
+        current_user: dict = Depends(get_current_user),
+        client: httpx.AsyncClient = Depends(get_http_client)
 ):
     """
     Show user's macro progress vs. their goals.
@@ -247,79 +360,45 @@ async def get_macro_progress(
     - User's target macros (from preferences)
     - User's actual macros (from dinner history)
     """
-    async with httpx.AsyncClient() as client:
-        # Get target macros
-        prefs_response = await client.get(
-            "http://localhost:8000/api/pantry/preferences",
-            headers={"Authorization": f"Bearer {current_user['token']}"}
-        )
-        preferences = prefs_response.json()
-
-        # Get actual macros
-        summary_response = await client.get(
-            f"http://localhost:8000/api/pantry/dinners/macros/summary?days={days}",
-            headers={"Authorization": f"Bearer {current_user['token']}"}
-        )
-        actual = summary_response.json()
-
-        # Calculate progress
-        return {
-            "period": f"Last {days} days",
-            "target": {
-                "calories": preferences.get("target_calories"),
-                "protein": preferences.get("target_protein"),
-                "carbs": preferences.get("target_carbs"),
-                "fat": preferences.get("target_fat")
-            },
-            "actual": {
-                "calories": actual["avg_calories"],
-                "protein": actual["avg_protein"],
-                "carbs": actual["avg_carbs"],
-                "fat": actual["avg_fat"]
-            },
-            "progress": {
-                "calories_percent": (actual["avg_calories"] / preferences["target_calories"] * 100) if preferences.get(
-                    "target_calories") else 0,
-                "protein_percent": (actual["avg_protein"] / preferences["target_protein"] * 100) if preferences.get(
-                    "target_protein") else 0,
-                # ... calculate others
-            }
-        }
-
-
-# ===== SCHEDULER (Optional - for 5 PM notifications) =====
-
-"""
-You can use APScheduler to automatically send recipe suggestions at 5 PM:
-
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-import asyncio
-
-scheduler = AsyncIOScheduler()
-
-async def send_daily_recipe_notifications():
-    '''Send recipe suggestion to all users at 5 PM'''
-    # Get all users
-    users = get_all_users()  # You need to implement this
+    # Get target macros
+    prefs_response = await client.get(
+        "http://localhost:8000/api/pantry/preferences",
+        headers={"Authorization": f"Bearer {current_user['token']}"}
+    )
+    preferences = prefs_response.json()
 
-    for user in users:
-        recipe = await recipe_service.get_daily_suggestion(user_id=user.id)
+    # Get actual macros
+    summary_response = await client.get(
+        f"http://localhost:8000/api/pantry/dinners/macros/summary?days={days}",
+        headers={"Authorization": f"Bearer {current_user['token']}"}
+    )
+    actual = summary_response.json()
 
-        # Send push notification to user's phone
-        await send_push_notification(
-            user_id=user.id,
-            title="What's for dinner?",
-            body=f"Try {recipe['name']} tonight! Ready in {recipe['ready_in_minutes']} min.",
-            data={"recipe": recipe}
-        )
+    # Calculate progress
+    return {
+        "period": f"Last {days} days",
+        "target": {
+            "calories": preferences.get("target_calories"),
+            "protein": preferences.get("target_protein"),
+            "carbs": preferences.get("target_carbs"),
+            "fat": preferences.get("target_fat")
+        },
+        "actual": {
+            "calories": actual["avg_calories"],
+            "protein": actual["avg_protein"],
+            "carbs": actual["avg_carbs"],
+            "fat": actual["avg_fat"]
+        },
+        "progress": {
+            "calories_percent": (actual["avg_calories"] / preferences["target_calories"] * 100) if preferences.get(
+                "target_calories") else 0,
+            "protein_percent": (actual["avg_protein"] / preferences["target_protein"] * 100) if preferences.get(
+                "target_protein") else 0,
+            # ... calculate others
+        }
+    }
 
-# Schedule for 5 PM every day
-scheduler.add_job(
-    send_daily_recipe_notifications,
-    'cron',
-    hour=17,
-    minute=0
-)
 
-scheduler.start()
-"""
\ No newline at end of file
+# ===== SCHEDULER =====
+# 5 PM notifications and the off-peak suggestion precompute run from the
+# FastAPI lifespan - see services/scheduler.py.
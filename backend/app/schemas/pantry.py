@@ -151,6 +151,32 @@ class BarcodeScanResponse(BaseModel):
     message: Optional[str] = None
 
 
+# Max barcodes in one batch scan (a full shopping trip)
+MAX_BATCH_SCAN_BARCODES = 300
+
+
+class BarcodeBatchScanRequest(BaseModel):
+    """Barcodes from one scanning session (duplicates are fine)"""
+    barcodes: list[str] = Field(..., min_length=1, max_length=MAX_BATCH_SCAN_BARCODES)
+
+
+class BarcodeBatchScanResult(BaseModel):
+    """One barcode of a batch scan"""
+    barcode: str
+    found: bool
+    item: Optional[PantryItemResponse] = None
+    source: Optional[str] = None  # "database", "external", or "pending" (lookup timed out, scan again)
+
+
+class BarcodeBatchScanResponse(BaseModel):
+    """Response from batch barcode scan, one result per distinct barcode in request order"""
+    found_count: int
+    created_count: int
+    not_found_count: int
+    pending_count: int = 0
+    results: list[BarcodeBatchScanResult]
+
+
 # ===== USER PREFERENCES SCHEMAS =====
 
 class UserPreferencesBase(BaseModel):
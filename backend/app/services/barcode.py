@@ -4,75 +4,141 @@ This service can integrate with APIs like:
 - Open Food Facts (free, good for food products)
 - UPCitemdb (free tier available)
 - Nutritionix (requires API key)
+
+Used read-through by /api/pantry/scan: barcodes no provider knows are
+remembered for a while (negative cache) so rescans don't go back to the
+network, and concurrent lookups of one barcode share a single request.
 """
 
-import httpx
+import math
+import time
+from collections import OrderedDict
 from typing import Optional, Dict
+from ..config import settings
 from ..schemas.pantry import PantryItemCreate, Category, UnitType
+from .rate_limiter import rate_limiter, parse_retry_after, OPEN_FOOD_FACTS
+from .http_clients import HTTPClients, http_clients
+from .single_flight import SingleFlight
+from .category_classifier import category_classifier
+
+# PantryItemBase field limits
+MAX_NAME_LENGTH = 200
+MAX_BRAND_LENGTH = 100
 
 
 class BarcodeService:
     """Service for looking up product info from barcodes"""
     
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClients] = None):
+        # Shared keep-alive pool (see http_clients.py)
+        self.http = http or http_clients
         self.open_food_facts_url = "https://world.openfoodfacts.org/api/v0/product"
         self.timeout = 10.0
+
+        # barcode -> expiry (monotonic) for barcodes no provider knows; LRU-bounded
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self.negative_ttl_seconds = settings.BARCODE_NEGATIVE_TTL_SECONDS
+        self.negative_max_entries = settings.BARCODE_NEGATIVE_CACHE_MAX_ENTRIES
+        # A whole cart of the same product scanned at once: one upstream request
+        self._lookups = SingleFlight()
+
+        # Metrics
+        self._found = 0
+        self._not_found = 0
+        self._negative_hits = 0
+        self._errors = 0
     
     async def lookup_barcode(self, barcode: str) -> Optional[Dict]:
         """
         Look up barcode in external databases.
         Returns product info if found, None otherwise.
+        The result is shared with concurrent callers for the same barcode: copy before mutating.
         """
+        if self._is_known_missing(barcode):
+            self._negative_hits += 1
+            return None
+        return await self._lookups.do(barcode, lambda: self._lookup_uncached(barcode))
+
+    async def _lookup_uncached(self, barcode: str) -> Optional[Dict]:
         # Try Open Food Facts first (it's free and has good coverage)
-        result = await self._lookup_open_food_facts(barcode)
+        try:
+            result = await self._lookup_open_food_facts(barcode)
+        except Exception as e:
+            # Timeouts, 429s and 5xx say nothing about the barcode: don't remember it as missing
+            self._errors += 1
+            print(f"Error looking up barcode in Open Food Facts: {e}")
+            return None
         
         if result:
+            self._found += 1
             return result
         
         # Could add more providers here as fallback
         # result = await self._lookup_upcitemdb(barcode)
         
+        self._not_found += 1
+        self._remember_missing(barcode)
         return None
-    
+
+    def _is_known_missing(self, barcode: str) -> bool:
+        expires_at = self._missing.get(barcode)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._missing[barcode]
+            return False
+        self._missing.move_to_end(barcode)
+        return True
+
+    def _remember_missing(self, barcode: str) -> None:
+        if self.negative_ttl_seconds <= 0:
+            return
+        self._missing[barcode] = time.monotonic() + self.negative_ttl_seconds
+        self._missing.move_to_end(barcode)
+        while len(self._missing) > self.negative_max_entries:
+            self._missing.popitem(last=False)
+
     async def _lookup_open_food_facts(self, barcode: str) -> Optional[Dict]:
-        """Query Open Food Facts API"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.open_food_facts_url}/{barcode}.json",
-                    headers={"User-Agent": "WhatsForDinner/1.0"}
-                )
-                
-                if response.status_code != 200:
-                    return None
-                
-                data = response.json()
-                
-                # Check if product was found
-                if data.get("status") != 1 or "product" not in data:
-                    return None
-                
-                product = data["product"]
-                
-                # Parse the response into our format
-                return self._parse_open_food_facts_response(product, barcode)
+        """Query Open Food Facts API; None if the product is unknown, raises on transient errors"""
+        await rate_limiter.acquire(OPEN_FOOD_FACTS)
+        response = await self.http.async_client().get(
+            f"{self.open_food_facts_url}/{barcode}.json",
+            headers={"User-Agent": "WhatsForDinner/1.0"},
+            timeout=self.timeout
+        )
         
-        except Exception as e:
-            print(f"Error looking up barcode in Open Food Facts: {e}")
+        if response.status_code == 429:
+            rate_limiter.throttled(OPEN_FOOD_FACTS, parse_retry_after(response.headers.get("retry-after")))
+            raise RuntimeError("rate limited by Open Food Facts (429)")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        
+        data = response.json()
+        
+        # Check if product was found
+        if data.get("status") != 1 or "product" not in data:
             return None
+        
+        product = data["product"]
+        
+        # Parse the response into our format
+        return self._parse_open_food_facts_response(product, barcode)
     
     def _parse_open_food_facts_response(self, product: Dict, barcode: str) -> Dict:
         """Convert Open Food Facts response to our PantryItem format"""
         
-        # Extract basic info
-        name = product.get("product_name", "Unknown Product")
-        brand = product.get("brands", "").split(",")[0].strip() if product.get("brands") else None
+        # Extract basic info (fields can be present but empty or null)
+        name = (product.get("product_name") or "").strip() or "Unknown Product"
+        brand = (product.get("brands") or "").split(",")[0].strip() or None
         
         # Try to determine category
         category = self._guess_category(product)
         
         # Get nutrition info (per 100g typically)
-        nutriments = product.get("nutriments", {})
+        nutriments = product.get("nutriments")
+        if not isinstance(nutriments, dict):
+            nutriments = {}
         serving_size = product.get("serving_size")
         
         # Parse serving size to get numeric value
@@ -89,10 +155,10 @@ class BarcodeService:
             "default_unit": serving_unit or UnitType.PIECE,
             
             # Nutrition per 100g (Open Food Facts standard)
-            "calories_per_serving": nutriments.get("energy-kcal_100g"),
-            "protein_per_serving": nutriments.get("proteins_100g"),
-            "carbs_per_serving": nutriments.get("carbohydrates_100g"),
-            "fat_per_serving": nutriments.get("fat_100g"),
+            "calories_per_serving": self._parse_nutriment(nutriments.get("energy-kcal_100g")),
+            "protein_per_serving": self._parse_nutriment(nutriments.get("proteins_100g")),
+            "carbs_per_serving": self._parse_nutriment(nutriments.get("carbohydrates_100g")),
+            "fat_per_serving": self._parse_nutriment(nutriments.get("fat_100g")),
             "serving_size": 100.0,
             "serving_unit": UnitType.GRAM,
             
@@ -101,35 +167,21 @@ class BarcodeService:
             "source_url": f"https://world.openfoodfacts.org/product/{barcode}"
         }
     
+    @staticmethod
+    def _parse_nutriment(value) -> Optional[float]:
+        """Nutriment value as a float; None for blanks and junk ("", "n/a"), which products often have"""
+        if value is None or isinstance(value, bool):
+            return None
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return number if math.isfinite(number) else None
+
     def _guess_category(self, product: Dict) -> Category:
         """Try to determine food category from product data"""
-        categories = product.get("categories", "").lower()
-        
-        # Simple keyword matching
-        if any(word in categories for word in ["meat", "chicken", "beef", "pork", "fish", "seafood"]):
-            return Category.PROTEIN
-        elif any(word in categories for word in ["pasta", "rice", "bread", "cereal", "grain"]):
-            return Category.GRAIN
-        elif any(word in categories for word in ["vegetable", "veggie"]):
-            return Category.VEGETABLE
-        elif any(word in categories for word in ["fruit", "apple", "banana", "orange"]):
-            return Category.FRUIT
-        elif any(word in categories for word in ["milk", "cheese", "yogurt", "dairy"]):
-            return Category.DAIRY
-        elif any(word in categories for word in ["sauce", "condiment", "dressing", "ketchup"]):
-            return Category.CONDIMENT
-        elif any(word in categories for word in ["spice", "seasoning", "herb"]):
-            return Category.SPICE
-        elif any(word in categories for word in ["canned", "can"]):
-            return Category.CANNED
-        elif any(word in categories for word in ["frozen"]):
-            return Category.FROZEN
-        elif any(word in categories for word in ["snack", "chip", "cookie", "candy"]):
-            return Category.SNACK
-        elif any(word in categories for word in ["beverage", "drink", "juice", "soda"]):
-            return Category.BEVERAGE
-        
-        return Category.OTHER
+        # Simple keyword matching, precompiled (see category_classifier.py)
+        return category_classifier.classify(product)
     
     def _parse_serving_size(self, serving_size: str) -> tuple[Optional[float], Optional[UnitType]]:
         """Parse serving size string to quantity and unit"""
@@ -161,34 +213,22 @@ class BarcodeService:
         """Convert barcode lookup result to PantryItemCreate schema"""
         # Remove source metadata before creating schema
         data = {k: v for k, v in barcode_data.items() if k not in ["source", "source_url"]}
+        # Product names/brands in Open Food Facts can exceed our column limits
+        data["name"] = data["name"][:MAX_NAME_LENGTH]
+        if data.get("brand"):
+            data["brand"] = data["brand"][:MAX_BRAND_LENGTH]
         return PantryItemCreate(**data)
 
+    def stats(self) -> Dict:
+        return {
+            "found": self._found,
+            "not_found": self._not_found,
+            "negative_hits": self._negative_hits,
+            "negative_entries": len(self._missing),
+            "errors": self._errors,
+            "single_flight": self._lookups.stats(),
+        }
+
 
 # Singleton instance
 barcode_service = BarcodeService()
-
-
-# Example usage in your scan endpoint:
-# ```python
-# @router.post("/scan-external")
-# async def scan_barcode_with_lookup(
-#     scan_request: BarcodeScanRequest,
-#     db: Session = Depends(get_db)
-# ):
-#     # First check if we already have it
-#     item = crud.get_pantry_item_by_barcode(db, scan_request.barcode)
-#     
-#     if item:
-#         return {"found": True, "item": item, "source": "database"}
-#     
-#     # Not in DB, try external lookup
-#     barcode_data = await barcode_service.lookup_barcode(scan_request.barcode)
-#     
-#     if barcode_data:
-#         # Create item in our database
-#         item_create = barcode_service.create_pantry_item_from_barcode(barcode_data)
-#         new_item = crud.create_pantry_item(db, item_create)
-#         return {"found": True, "item": new_item, "source": "external"}
-#     
-#     return {"found": False, "message": "Product not found"}
-# ```
@@ -0,0 +1,84 @@
+"""
+Category Classifier - Guesses a pantry Category from a product's category text
+
+Rules are keyword lists checked in priority order; the first rule with any
+keyword inside the (lowercased) text wins, e.g. "Meats, Frozen foods" is
+protein, not frozen. Compiled once into a flat (keyword, category) table in
+that same order, so the first keyword found always belongs to the first
+matching rule - identical results to checking rule by rule, without building
+a generator per rule per product.
+
+Substring search (str.__contains__) runs in C and beats both a single
+alternation regex and a pure-Python Aho-Corasick automaton here; a single
+regex pass also can't be exact, since keywords overlap across rules
+("cheese" / "seafood", "ketchup" / "pasta").
+
+Bulk callers (catalog import, re-categorization) use classify_many, which
+classifies each distinct category string once; category chains repeat a lot.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..schemas.pantry import Category
+
+# Priority order: the first rule with a keyword in the text wins
+CATEGORY_RULES: Tuple[Tuple[Category, Tuple[str, ...]], ...] = (
+    (Category.PROTEIN, ("meat", "chicken", "beef", "pork", "fish", "seafood")),
+    (Category.GRAIN, ("pasta", "rice", "bread", "cereal", "grain")),
+    (Category.VEGETABLE, ("vegetable", "veggie")),
+    (Category.FRUIT, ("fruit", "apple", "banana", "orange")),
+    (Category.DAIRY, ("milk", "cheese", "yogurt", "dairy")),
+    (Category.CONDIMENT, ("sauce", "condiment", "dressing", "ketchup")),
+    (Category.SPICE, ("spice", "seasoning", "herb")),
+    (Category.CANNED, ("canned", "can")),
+    (Category.FROZEN, ("frozen",)),
+    (Category.SNACK, ("snack", "chip", "cookie", "candy")),
+    (Category.BEVERAGE, ("beverage", "drink", "juice", "soda")),
+)
+
+
+class CategoryClassifier:
+    """Keyword rules compiled into one ordered lookup table"""
+
+    def __init__(
+            self,
+            rules: Sequence[Tuple[Category, Sequence[str]]] = CATEGORY_RULES,
+            default: Category = Category.OTHER,
+            cache_size: int = 4096
+    ):
+        self._table = tuple((keyword, category) for category, keywords in rules for keyword in keywords)
+        self.default = default
+        # Single-product calls (scans, the import loop) still skip repeated category strings
+        self._classify_cached = lru_cache(maxsize=cache_size)(self._classify_text)
+
+    def _classify_text(self, text: str) -> Category:
+        text = text.lower()
+        for keyword, category in self._table:
+            if keyword in text:
+                return category
+        return self.default
+
+    def classify_text(self, text: Optional[str]) -> Category:
+        """Category for a raw categories string (e.g. "Dairies, Cheeses")"""
+        return self._classify_cached(text or "")
+
+    def classify(self, product: Dict) -> Category:
+        """Category for an Open Food Facts product dict"""
+        return self._classify_cached(product.get("categories") or "")
+
+    def classify_many(self, products: Iterable[Dict]) -> List[Category]:
+        """Categories for many products, in order; each distinct categories string is classified once"""
+        seen: Dict[str, Category] = {}
+        results = []
+        for product in products:
+            text = product.get("categories") or ""
+            category = seen.get(text)
+            if category is None:
+                category = seen[text] = self._classify_text(text)
+            results.append(category)
+        return results
+
+
+# Singleton instance
+category_classifier = CategoryClassifier()
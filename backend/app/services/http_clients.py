@@ -0,0 +1,117 @@
+"""
+HTTP Clients - Long-lived, pooled clients for every outbound call
+
+Opening a client per call pays DNS + TCP + TLS setup every time. Instead one
+AsyncClient (routes, barcode lookups, image providers and downloads) is created
+in the FastAPI lifespan and reused, with keep-alive and HTTP/2 when the h2
+package is installed. The async OpenAI SDK client is built once on top of it.
+
+Outside the app (scripts, the scheduler run by hand) the clients are created
+lazily on first use.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from ..config import settings
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    from openai import AsyncOpenAI
+except ImportError:
+    AsyncOpenAI = None
+
+
+def _pool_stats(client) -> Dict:
+    """Connection counts from the client's pool (httpcore internals; best effort)"""
+    try:
+        connections = client._transport._pool.connections
+    except AttributeError:
+        return {}
+    return {
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "http2": sum(1 for c in connections if "HTTP/2" in c.info()),
+    }
+
+
+class HTTPClients:
+    """Holder for the app-lifetime HTTP clients"""
+
+    def __init__(self):
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_openai = None
+        self._lock = threading.Lock()
+        self._requests: Dict[str, int] = {}
+
+    def _options(self) -> Dict:
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "limits": httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            "timeout": httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+        }
+
+    async def _count(self, request: httpx.Request) -> None:
+        with self._lock:
+            self._requests[request.url.host] = self._requests.get(request.url.host, 0) + 1
+
+    def start(self) -> None:
+        """Create the clients (call from the app lifespan)"""
+        self.async_client()
+
+    async def close(self) -> None:
+        with self._lock:
+            async_client = self._async_client
+            self._async_client = self._async_openai = None
+        if async_client is not None:
+            await async_client.aclose()
+
+    def async_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(
+                    event_hooks={"request": [self._count]}, **self._options()
+                )
+            return self._async_client
+
+    def async_openai_client(self):
+        """Shared async OpenAI client on the async pool, or None without the SDK or an API key"""
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key or AsyncOpenAI is None:
+            return None
+        http_client = self.async_client()
+        with self._lock:
+            if self._async_openai is None:
+                self._async_openai = AsyncOpenAI(api_key=api_key, http_client=http_client)
+            return self._async_openai
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "http2_available": HTTP2_AVAILABLE,
+                "max_connections": settings.HTTP_MAX_CONNECTIONS,
+                "max_keepalive_connections": settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                "async_pool": _pool_stats(self._async_client) if self._async_client else None,
+                "requests_by_host": dict(self._requests),
+            }
+
+
+# Singleton instance
+http_clients = HTTPClients()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """FastAPI dependency: the shared async client"""
+    return http_clients.async_client()
@@ -0,0 +1,186 @@
+"""
+Image Cache - Persistent, content-addressed cache for recipe image lookups
+
+generate_recipe_image_url pays for every DALL-E image and Spoonacular search.
+Results are cached in a small SQLite file keyed by a hash of the normalized
+recipe name / search keywords, so "Chicken Stir Fry" is imaged once no matter
+how many users get it.
+
+- Each provider gets its own TTL: DALL-E URLs expire upstream after about an hour,
+  Spoonacular image URLs are stable.
+- Negative results (no paid provider produced an image) are cached briefly,
+  so a failing upstream isn't retried for every recipe.
+- Size is bounded: least recently used entries are evicted past max_entries.
+- Concurrent lookups for the same key share one generation (see
+  recipe_image_service.generate_recipe_image_url).
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from ..config import settings
+
+# Provider recorded for a negative result (only the placeholder was available)
+NEGATIVE = "none"
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_image_query(query: str) -> str:
+    """'Chicken  Stir-Fry!' -> 'chicken stir fry'"""
+    return " ".join(_NON_WORD.sub(" ", (query or "").lower()).split())
+
+
+def image_cache_key(query: str) -> str:
+    return hashlib.sha256(normalize_image_query(query).encode()).hexdigest()
+
+
+@dataclass
+class CachedImage:
+    url: str
+    provider: str
+    expires_at: float
+
+    @property
+    def negative(self) -> bool:
+        return self.provider == NEGATIVE
+
+
+class ImageCache:
+    """SQLite-backed TTL + LRU cache of image URLs (thread-safe; used from worker threads)"""
+
+    def __init__(self, path: str, max_entries: int, ttl_by_provider: Dict[str, float]):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_by_provider = ttl_by_provider
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Caller holds self._lock
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS image_cache ("
+                " key TEXT PRIMARY KEY,"
+                " query TEXT NOT NULL,"
+                " url TEXT NOT NULL,"
+                " provider TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_image_cache_last_access ON image_cache (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, query: str) -> Optional[CachedImage]:
+        key = image_cache_key(query)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT url, provider, expires_at FROM image_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[2] <= now:
+                if row is not None:
+                    conn.execute("DELETE FROM image_cache WHERE key = ?", (key,))
+                    conn.commit()
+                self._misses += 1
+                return None
+
+            conn.execute("UPDATE image_cache SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            cached = CachedImage(url=row[0], provider=row[1], expires_at=row[2])
+            if cached.negative:
+                self._negative_hits += 1
+            else:
+                self._hits += 1
+            return cached
+
+    def put(self, query: str, url: str, provider: str, ttl_seconds: Optional[float] = None) -> None:
+        """Store a result; the TTL defaults to the provider's (unknown providers get the negative TTL)"""
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_by_provider.get(provider, self.ttl_by_provider[NEGATIVE])
+        if ttl_seconds <= 0:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO image_cache (key, query, url, provider, created_at, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (image_cache_key(query), normalize_image_query(query), url, provider, now, now + ttl_seconds, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM image_cache WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM image_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM image_cache WHERE key IN"
+                " (SELECT key FROM image_cache ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            self._evictions += excess
+
+    def repoint(self, query: str, old_url: str, new_url: str, provider: str = "local") -> bool:
+        """Swap a cached positive result for a copy of the same image (e.g. our local mirror)"""
+        ttl_seconds = self.ttl_by_provider.get(provider, self.ttl_by_provider[NEGATIVE])
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "UPDATE image_cache SET url = ?, provider = ?, expires_at = ?"
+                " WHERE key = ? AND url = ? AND provider != ?",
+                (new_url, provider, now + ttl_seconds, image_cache_key(query), old_url, NEGATIVE)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM image_cache")
+            conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            (entries,) = self._connection().execute("SELECT COUNT(*) FROM image_cache").fetchone()
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+# Singleton instance
+image_cache = ImageCache(
+    path=settings.IMAGE_CACHE_PATH,
+    max_entries=settings.IMAGE_CACHE_MAX_ENTRIES,
+    ttl_by_provider={
+        "openai": settings.IMAGE_CACHE_OPENAI_TTL_SECONDS,
+        "spoonacular": settings.IMAGE_CACHE_SPOONACULAR_TTL_SECONDS,
+        "local": settings.IMAGE_CACHE_LOCAL_TTL_SECONDS,
+        NEGATIVE: settings.IMAGE_CACHE_NEGATIVE_TTL_SECONDS,
+    },
+)
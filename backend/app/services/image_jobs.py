@@ -0,0 +1,208 @@
+"""
+Image Jobs - Recipe image generation off the request path
+
+DALL-E takes several seconds per image, far longer than the Gemini text. With
+deferred images (RECIPE_DEFER_IMAGES) a suggestion is returned as soon as it
+validates, carrying the deterministic Lorem Flickr placeholder and an
+image_job_id. A small pool of background workers then generates the real
+image (and starts mirroring it); clients poll /api/recipe/images/{job_id} (or
+the batch endpoint) and swap it in.
+
+Jobs are kept in memory and deduplicated by dish: two recipes named "Chicken
+Stir Fry" share one job. At most IMAGE_JOB_MAX_JOBS jobs are unfinished at a
+time; past that submit() refuses and the recipe keeps its placeholder.
+Finished jobs are kept for IMAGE_JOB_TTL_SECONDS; the result itself lives on
+in the persistent image cache, so recipes served later from the suggestion
+store resolve without a job.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from .image_cache import image_cache_key
+from .image_store import image_store
+from .recipe_image_service import generate_recipe_image_url, placeholder_image_url
+
+# Job statuses
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+async def render_recipe_image(query: str) -> Tuple[Optional[str], Optional[Dict[str, str]]]:
+    """
+    Image for one dish: generate (cached) and return it right away. Upstream images are
+    mirrored in the background; an already mirrored one comes with its thumbnails.
+    """
+    url = await generate_recipe_image_url(query)
+    image_store.mirror_later(url, query)
+    return url, image_store.variants(url)
+
+
+@dataclass
+class ImageJob:
+    job_id: str
+    query: str
+    placeholder_url: str
+    status: str = PENDING
+    image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    # Set once the job is finished (either way), for callers that need the result
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> Dict:
+        """Poll response: the placeholder stands in until the real image is ready"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "image_url": self.image_url or self.placeholder_url,
+            "image_variants": self.image_variants,
+        }
+
+
+class ImageJobs:
+    """In-memory job table plus the background workers that drain it"""
+
+    def __init__(self, workers: int, ttl_seconds: float, max_jobs: int):
+        self.workers = max(1, workers)
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, ImageJob] = {}  # insertion ordered: oldest first
+        self._active: Dict[str, str] = {}  # image cache key -> job_id of an unfinished job
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self._submitted = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_seconds = 0.0
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        # First use (or a new event loop, e.g. a restarted app): jobs from the old loop can't run here
+        for job_id in list(self._active.values()):
+            job = self._jobs.get(job_id)
+            if job is not None and not job.finished:
+                job.status = FAILED
+                job.error = "worker stopped"
+                job.finished_at = time.time()
+                job.done.set()
+        self._active.clear()
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, query: str) -> Optional[ImageJob]:
+        """
+        Queue image generation for a dish (joins an unfinished job for the same dish).
+        None if max_jobs jobs are already unfinished: the backlog would only grow.
+        """
+        self._ensure_workers()
+        key = image_cache_key(query)
+        job_id = self._active.get(key)
+        if job_id is not None:
+            self._deduplicated += 1
+            return self._jobs[job_id]
+        if len(self._active) >= self.max_jobs:
+            self._rejected += 1
+            return None
+
+        self._prune()
+        job = ImageJob(job_id=uuid.uuid4().hex, query=query, placeholder_url=placeholder_image_url(query))
+        self._jobs[job.job_id] = job
+        self._active[key] = job.job_id
+        self._submitted += 1
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImageJob]:
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        """Forget finished jobs past their TTL, then the oldest finished ones past max_jobs"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        excess = len(self._jobs) - self.max_jobs + 1
+        if excess > 0:
+            oldest_finished = [job_id for job_id, job in self._jobs.items() if job.finished][:excess]
+            for job_id in oldest_finished:
+                del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            started = time.monotonic()
+            try:
+                job.image_url, job.image_variants = await render_recipe_image(job.query)
+                job.status = DONE
+                self._completed += 1
+            except asyncio.CancelledError:
+                # Worker stopped (app shutdown or a closed event loop) mid-job
+                job.status = FAILED
+                job.error = "worker stopped"
+                raise
+            except Exception as e:
+                print(f"Error generating image for '{job.query}': {e}")
+                job.status = FAILED
+                job.error = str(e)
+                self._failed += 1
+            finally:
+                job.finished_at = time.time()
+                self._total_seconds += time.monotonic() - started
+                self._active.pop(image_cache_key(job.query), None)
+                job.done.set()
+
+    async def close(self) -> None:
+        """Stop the workers (call from the app lifespan); unfinished jobs are dropped"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        finished = self._completed + self._failed
+        return {
+            "workers": self.workers,
+            "jobs": len(self._jobs),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "active": len(self._active),
+            "submitted": self._submitted,
+            "deduplicated": self._deduplicated,
+            "rejected": self._rejected,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_seconds": self._total_seconds / finished if finished else 0.0,
+        }
+
+
+# Singleton instance
+image_jobs = ImageJobs(
+    workers=settings.IMAGE_JOB_WORKERS,
+    ttl_seconds=settings.IMAGE_JOB_TTL_SECONDS,
+    max_jobs=settings.IMAGE_JOB_MAX_JOBS,
+)
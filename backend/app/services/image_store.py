@@ -0,0 +1,205 @@
+"""
+Image Store - Local, content-addressed mirror of recipe images
+
+DALL-E URLs expire after about an hour and every image is otherwise fetched from a
+remote CDN. After an image is generated (or found), it is downloaded once in
+the background (mirror_later) through the shared HTTP pool and written to
+IMAGE_STORE_DIR as <sha256 of the bytes>.<ext>; the recipe goes out with the
+upstream URL meanwhile. Local URLs point at our own static route
+(routes/images.py), which serves them with a strong ETag and an immutable
+Cache-Control header.
+
+The image cache entry for the dish is then repointed at the local copy, so
+cached and stored suggestions (which re-resolve their images through it) and
+later recipes for the dish get the local URL.
+
+Each original also gets smaller size variants (services/image_thumbnails.py),
+exposed on recipes as image_variants. They are encoded in the background: the
+local URL is returned as soon as the original is written, and variants show up
+through variants() once they exist.
+
+Clients load image_url as is, so local URLs must be absolute: mirroring only
+runs when IMAGE_STORE_BASE_URL is set, and the upstream URL is kept otherwise.
+Lorem Flickr placeholders are never mirrored (they are random per request).
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+from typing import Dict, Optional
+
+from ..config import settings
+from .http_clients import HTTPClients, http_clients
+from .image_cache import image_cache
+from .image_thumbnails import ThumbnailPipeline
+from .recipe_image_service import is_placeholder_image_url
+from .single_flight import SingleFlight
+
+# URL path the static route is mounted on
+IMAGE_ROUTE_PREFIX = "/static/recipe-images"
+
+_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+# Filenames we write (and the only ones the static route serves)
+FILENAME_PATTERN = re.compile(r"^[0-9a-f]{64}(?:_w\d+)?\.(?:jpg|png|webp|gif)$")
+
+
+class ImageStore:
+    """Downloads remote images into a content-addressed directory"""
+
+    def __init__(
+            self,
+            root_dir: str,
+            base_url: str,
+            thumbnails: ThumbnailPipeline,
+            http: Optional[HTTPClients] = None
+    ):
+        self.root_dir = root_dir
+        # Without a public base URL a local link would be root-relative, which clients can't load
+        self.configured = bool(base_url.strip())
+        self.base_url = base_url.rstrip("/") + IMAGE_ROUTE_PREFIX
+        self.thumbnails = thumbnails
+        self.http = http or http_clients
+        # Several recipes often share one image URL (cached dishes): download it once
+        self._downloads = SingleFlight()
+        # Background work (mirrors, thumbnail encodes) still running; holds strong references
+        self._background: set = set()
+
+        # Metrics
+        self._mirrored = 0
+        self._already_stored = 0
+        self._failed = 0
+        self._bytes = 0
+
+    def is_local(self, url: Optional[str]) -> bool:
+        return bool(url) and url.startswith(self.base_url + "/")
+
+    def local_url(self, filename: str) -> str:
+        return f"{self.base_url}/{filename}"
+
+    def path_for(self, filename: str) -> Optional[str]:
+        """Absolute path of a stored file, or None for names we never write"""
+        if not FILENAME_PATTERN.match(filename):
+            return None
+        return os.path.join(self.root_dir, filename)
+
+    def variants(self, url: Optional[str]) -> Optional[Dict[str, str]]:
+        """Thumbnail URLs of a mirrored image keyed by width ("320": url), or None if there are none"""
+        if not self.is_local(url):
+            return None
+        stem = url[len(self.base_url) + 1:].rsplit(".", 1)[0]
+        found = self.thumbnails.existing(self.root_dir, stem)
+        return {str(width): self.local_url(filename) for width, filename in found.items()} or None
+
+    def should_mirror(self, url: Optional[str]) -> bool:
+        if not url or not settings.IMAGE_STORE_ENABLED or not self.configured or self.is_local(url):
+            return False
+        return not is_placeholder_image_url(url)
+
+    def mirror_later(self, url: Optional[str], query: Optional[str] = None) -> None:
+        """Mirror in the background; the image cache entry for query is repointed when it is done"""
+        if self.should_mirror(url):
+            self._spawn(self.mirror(url, query))
+
+    async def mirror(self, url: Optional[str], query: Optional[str] = None) -> Optional[str]:
+        """
+        Local URL for a remote image (downloading it if needed), or the original URL if that fails.
+        With query, the image cache entry for it is repointed at the local copy.
+        """
+        if not self.should_mirror(url):
+            return url
+
+        try:
+            filename = await self._downloads.do(url, lambda: self._download(url))
+        except Exception as e:
+            self._failed += 1
+            print(f"Error mirroring image {url[:80]}: {e}")
+            return url
+
+        local = self.local_url(filename)
+        if query:
+            try:
+                await asyncio.to_thread(image_cache.repoint, query, url, local)
+            except Exception as e:
+                print(f"Image cache write error: {e}")
+        return local
+
+    async def _download(self, url: str) -> str:
+        response = await self.http.async_client().get(
+            url, timeout=settings.IMAGE_STORE_DOWNLOAD_TIMEOUT_SECONDS, follow_redirects=True
+        )
+        response.raise_for_status()
+
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        extension = _EXTENSIONS.get(content_type)
+        if extension is None:
+            raise ValueError(f"not an image ({content_type or 'no content-type'})")
+        content = response.content
+        if len(content) > settings.IMAGE_STORE_MAX_BYTES:
+            raise ValueError(f"image too large ({len(content)} bytes)")
+
+        filename = f"{hashlib.sha256(content).hexdigest()}.{extension}"
+        written = await asyncio.to_thread(self._write, filename, content)
+        if written:
+            self._mirrored += 1
+            self._bytes += len(content)
+        else:
+            self._already_stored += 1
+        # Also fills in variants missing for originals stored before thumbnails were enabled.
+        # Not awaited: the recipe can go out with the original while the variants are encoded
+        self._spawn(self.thumbnails.generate(os.path.join(self.root_dir, filename)))
+        return filename
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _write(self, filename: str, content: bytes) -> bool:
+        """Atomically write a file unless identical content is already stored; True if written"""
+        path = os.path.join(self.root_dir, filename)
+        if os.path.exists(path):
+            return False
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return True
+
+    def close(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        self.thumbnails.close()
+
+    def stats(self) -> Dict:
+        return {
+            "mirrored": self._mirrored,
+            "already_stored": self._already_stored,
+            "configured": self.configured,
+            "failed": self._failed,
+            "bytes_written": self._bytes,
+            "background_tasks": len(self._background),
+            "thumbnails": self.thumbnails.stats(),
+        }
+
+
+# Singleton instance
+image_store = ImageStore(
+    root_dir=settings.IMAGE_STORE_DIR,
+    base_url=settings.IMAGE_STORE_BASE_URL,
+    thumbnails=ThumbnailPipeline(
+        enabled=settings.IMAGE_THUMBNAILS_ENABLED,
+        widths=settings.IMAGE_THUMBNAIL_WIDTHS,
+        image_format=settings.IMAGE_THUMBNAIL_FORMAT,
+        quality=settings.IMAGE_THUMBNAIL_QUALITY,
+        workers=settings.IMAGE_THUMBNAIL_WORKERS,
+    ),
+)
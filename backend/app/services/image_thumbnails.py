@@ -0,0 +1,145 @@
+"""
+Image Thumbnails - Smaller variants of mirrored recipe images
+
+Recipe cards are shown at a fraction of the 1024x1024 DALL-E size. After the
+image store writes an original, it is decoded once and re-encoded (WebP, or
+JPEG when Pillow has no WebP support) at each configured width, next to the
+original as <sha256>_w<width>.<ext>.
+
+Decoding and encoding are CPU-bound, so they run in a process pool and never
+block the event loop (or hold the GIL for request threads). Without Pillow the
+stage is skipped and recipes simply have no variants.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+    features = None
+
+_PIL_FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+
+
+def thumbnail_filename(stem: str, width: int, extension: str) -> str:
+    return f"{stem}_w{width}.{extension}"
+
+
+def render_thumbnails(
+        source_path: str,
+        stem: str,
+        widths: Sequence[int],
+        extension: str,
+        quality: int
+) -> List[int]:
+    """
+    Write the missing thumbnails of one image (runs in a worker process).
+    Widths at or above the original's are skipped (never upscale). Returns the widths written.
+    """
+    root_dir = os.path.dirname(source_path)
+    pending = [
+        width for width in sorted(set(widths), reverse=True)
+        if not os.path.exists(os.path.join(root_dir, thumbnail_filename(stem, width, extension)))
+    ]
+    if not pending:
+        return []
+
+    written = []
+    with Image.open(source_path) as original:
+        original.load()
+        has_alpha = original.mode in ("RGBA", "LA", "PA") or "transparency" in original.info
+        image = original.convert("RGBA" if has_alpha and extension == "webp" else "RGB")
+
+        # Largest first, each one resized from the previous: cheaper than always starting at full size
+        for width in pending:
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+            path = os.path.join(root_dir, thumbnail_filename(stem, width, extension))
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            image.save(tmp_path, format=_PIL_FORMATS[extension], quality=quality)
+            os.replace(tmp_path, path)
+            written.append(width)
+    return written
+
+
+class ThumbnailPipeline:
+    """Generates and looks up size variants of stored images"""
+
+    def __init__(self, enabled: bool, widths: Sequence[int], image_format: str, quality: int, workers: int):
+        self.enabled = enabled and Image is not None and bool(widths)
+        self.widths = sorted(set(widths))
+        self.quality = quality
+        self.workers = max(1, workers)
+        use_webp = image_format.lower() == "webp" and features is not None and features.check("webp")
+        self.extension = "webp" if use_webp else "jpg"
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        # Metrics
+        self._images = 0
+        self._thumbnails = 0
+        self._failed = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: the app runs threads (scheduler, to_thread workers), which don't mix with fork
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def generate(self, source_path: str) -> None:
+        """Create the missing thumbnails for a stored original; failures are logged, never raised"""
+        if not self.enabled:
+            return
+        stem = os.path.basename(source_path).rsplit(".", 1)[0]
+        loop = asyncio.get_running_loop()
+        try:
+            written = await loop.run_in_executor(
+                self._executor(), render_thumbnails,
+                source_path, stem, self.widths, self.extension, self.quality
+            )
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. out of memory): start a fresh pool next time
+                self.close()
+            self._failed += 1
+            print(f"Error creating thumbnails for {os.path.basename(source_path)}: {e}")
+            return
+        if written:
+            self._images += 1
+            self._thumbnails += len(written)
+
+    def existing(self, root_dir: str, stem: str) -> Dict[int, str]:
+        """width -> filename for the thumbnails of stem that are on disk"""
+        if not self.enabled:
+            return {}
+        found = {}
+        for width in self.widths:
+            filename = thumbnail_filename(stem, width, self.extension)
+            if os.path.exists(os.path.join(root_dir, filename)):
+                found[width] = filename
+        return found
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "widths": self.widths,
+            "format": self.extension,
+            "images": self._images,
+            "thumbnails": self._thumbnails,
+            "failed": self._failed,
+        }
@@ -0,0 +1,80 @@
+"""
+Ingredient Matcher - Precompiled inventory check for generated recipes
+
+Same rule as the original fuzzy check in RecipeService._is_recipe_valid:
+an ingredient is available if any inventory name is a substring of it
+("chicken" in "grilled chicken") or it is a substring of any inventory name
+("rice" in "jasmine rice"). Water and salt are always available.
+
+Instead of testing every ingredient against every inventory item, the
+inventory is compiled once per request:
+- a hash set of names (bucketed by length) answers "does any inventory name occur
+  in this ingredient?" by probing only the ingredient's substrings of those lengths
+- one joined haystack string answers "does this ingredient occur in any inventory name?"
+and results are memoized, since retries keep producing the same ingredient names.
+Building is a couple of set/join operations, so it stays cheap for large pantries.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+# Explicit staples that don't need to be in inventory
+STAPLES = frozenset({"water", "salt"})
+
+# Cannot appear in a normalized ingredient name, so it never creates cross-item matches
+_SEPARATOR = "\x00"
+
+
+class IngredientMatcher:
+    """Compiled view of a user's inventory for fast recipe validation"""
+
+    def __init__(self, available: Iterable[str]):
+        names = {i.lower().strip() for i in available}
+        # An empty inventory name is a substring of everything (kept for parity with the old check)
+        self._matches_everything = "" in names
+        names.discard("")
+
+        self._inventory_names = frozenset(names)
+        # Longest first so the common "full inventory name inside ingredient" case hits early
+        self._name_lengths = sorted({len(n) for n in names}, reverse=True)
+        self._haystack = _SEPARATOR.join(names)
+        self._memo: Dict[str, bool] = {}
+
+    def is_available(self, ingredient_name: str) -> bool:
+        """True if the (raw) ingredient name is a staple or fuzzy-matches the inventory"""
+        name = ingredient_name.lower().strip()
+        if not name or name in STAPLES:
+            return True
+
+        cached = self._memo.get(name)
+        if cached is not None:
+            return cached
+
+        if self._matches_everything:
+            found = True
+        elif _SEPARATOR in name:
+            found = any(inv in name or name in inv for inv in self._inventory_names)
+        else:
+            found = name in self._haystack or self._contains_inventory_name(name)
+
+        self._memo[name] = found
+        return found
+
+    def _contains_inventory_name(self, name: str) -> bool:
+        """True if some inventory name is a substring of `name`"""
+        names = self._inventory_names
+        size = len(name)
+        for length in self._name_lengths:
+            if length > size:
+                continue
+            for start in range(size - length + 1):
+                if name[start:start + length] in names:
+                    return True
+        return False
+
+    def first_missing(self, ingredients: List[Dict]) -> Optional[str]:
+        """Return the first ingredient name (normalized) not covered by the inventory, or None"""
+        for ing in ingredients:
+            name = ing.get("name", "").lower().strip()
+            if not self.is_available(name):
+                return name
+        return None
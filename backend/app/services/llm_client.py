@@ -0,0 +1,162 @@
+"""
+LLM Client - Async Gemini access with bounded concurrency, timeouts and metrics
+
+Calls go through the SDK's native async API (generate_content_async), so they
+never occupy a thread in the default executor shared with image generation;
+stream() yields text chunks as Gemini produces them.
+A semaphore caps how many calls are in flight at once; callers beyond the cap
+queue up, and both the queue depth and in-flight count are exposed via stats().
+Every call also takes a token from the shared Gemini rate-limit bucket, and a
+429 (ResourceExhausted) backs the whole bucket off.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import google.generativeai as genai
+from google.api_core.exceptions import ResourceExhausted
+
+from ..config import settings
+from .rate_limiter import rate_limiter, GEMINI
+
+
+class LLMClient:
+    """Bounded, timed async wrapper around a Gemini GenerativeModel"""
+
+    def __init__(
+            self,
+            api_key: Optional[str],
+            model_name: str,
+            max_concurrency: int,
+            timeout_seconds: float
+    ):
+        self.model_name = model_name
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max(1, max_concurrency)
+
+        if api_key:
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(model_name)
+        else:
+            self._model = None
+            print("WARNING: GEMINI_API_KEY not found. Recipe generation will fail.")
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Metrics
+        self._queued = 0
+        self._in_flight = 0
+        self._calls = 0
+        self._errors = 0
+        self._timeouts = 0
+        self._total_latency = 0.0
+        self._total_queue_wait = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self._model is not None
+
+    async def generate(self, prompt: str, timeout_seconds: Optional[float] = None) -> str:
+        """
+        Generate text for a prompt.
+        Raises asyncio.TimeoutError if the call exceeds its timeout (queue time not included).
+        """
+        async with self._slot():
+            response = await asyncio.wait_for(
+                self._model.generate_content_async(prompt),
+                timeout=timeout_seconds or self.timeout_seconds,
+            )
+            return response.text
+
+    async def stream(self, prompt: str, timeout_seconds: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Generate text for a prompt, yielding chunks as they arrive.
+        The timeout covers the whole stream; the slot is held until the generator is closed.
+        """
+        async with self._slot():
+            deadline = time.monotonic() + (timeout_seconds or self.timeout_seconds)
+            response = await asyncio.wait_for(
+                self._model.generate_content_async(prompt, stream=True),
+                timeout=self._remaining(deadline),
+            )
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self._remaining(deadline))
+                except StopAsyncIteration:
+                    return
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. the final finish_reason chunk)
+                    continue
+                if text:
+                    yield text
+
+    @staticmethod
+    def _remaining(deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return remaining
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Wait for a concurrency slot, then record the call's outcome and latency"""
+        if not self._model:
+            raise RuntimeError("LLM client is not configured (missing GEMINI_API_KEY)")
+
+        queued_at = time.monotonic()
+        self._queued += 1
+        try:
+            # Quota first, so a call waiting on the rate limit doesn't hold a concurrency slot
+            await rate_limiter.acquire(GEMINI)
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        started_at = time.monotonic()
+        self._total_queue_wait += started_at - queued_at
+        self._in_flight += 1
+        self._calls += 1
+        try:
+            yield
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            self._errors += 1
+            if isinstance(e, ResourceExhausted):
+                rate_limiter.throttled(GEMINI)
+            raise
+        finally:
+            self._in_flight -= 1
+            self._total_latency += time.monotonic() - started_at
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        """Snapshot of queue depth, in-flight calls and call outcomes"""
+        return {
+            "model": self.model_name,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self._queued,
+            "in_flight": self._in_flight,
+            "calls": self._calls,
+            "errors": self._errors,
+            "timeouts": self._timeouts,
+            "avg_latency_seconds": self._total_latency / self._calls if self._calls else 0.0,
+            "avg_queue_wait_seconds": self._total_queue_wait / self._calls if self._calls else 0.0,
+        }
+
+
+# Singleton instance
+llm_client = LLMClient(
+    api_key=settings.GEMINI_API_KEY,
+    model_name=settings.GEMINI_MODEL,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    timeout_seconds=settings.LLM_TIMEOUT_SECONDS,
+)
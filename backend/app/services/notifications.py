@@ -0,0 +1,18 @@
+"""
+Notifications - Push delivery to users' phones
+
+No push provider (APNs) is wired up yet, so send_push_notification only logs
+the payload. The 5 PM fan-out job (services/scheduler.py) calls it per user.
+"""
+
+from typing import Dict, Optional
+
+
+async def send_push_notification(
+        user_id: int,
+        title: str,
+        body: str,
+        data: Optional[Dict] = None
+) -> None:
+    """Send a push notification to a user's devices"""
+    print(f"PUSH to user {user_id}: {title} - {body}")
@@ -0,0 +1,128 @@
+"""
+Pantry Bitset - Bulk feasibility and coverage of recipes against a pantry
+
+Every canonical ingredient gets a bit position (most common ingredients first),
+every recipe's required ingredients become a packed bitset, and so does the
+user's pantry. Then for the whole recipe table at once:
+- feasible:  recipe & ~pantry == 0   (nothing missing)
+- coverage:  popcount(recipe & pantry)
+
+With NumPy the bitsets live in a word-major uint64 matrix (one contiguous row
+per 64 ingredients, one column per recipe), so feasibility is a handful of
+vectorized AND/OR passes over contiguous memory; without it every recipe is a
+Python int (same results, slower).
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _popcount_columns(matrix: "np.ndarray") -> "np.ndarray":
+    """Set bits per column of a word-major uint64 matrix"""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(matrix).sum(axis=0, dtype=np.int64)
+    bits = np.unpackbits(np.ascontiguousarray(matrix.T).view(np.uint8), axis=1)
+    return bits.sum(axis=1, dtype=np.int64)
+
+
+class PantryBitsetIndex:
+    """Recipes as ingredient bitsets, ranked against a pantry in bulk"""
+
+    def __init__(
+            self,
+            recipes: Sequence[Tuple[int, Iterable[str]]],
+            tiebreak: Optional[Sequence[float]] = None
+    ):
+        """
+        recipes: (recipe_id, canonical ingredients) pairs.
+        tiebreak: optional per-recipe value ranked ascending among equal coverage (e.g. ready minutes).
+        """
+        self.recipe_ids = [recipe_id for recipe_id, _ in recipes]
+        ingredient_sets = [frozenset(ingredients) for _, ingredients in recipes]
+
+        frequency = Counter(ing for ingredients in ingredient_sets for ing in ingredients)
+        self.bit_of: Dict[str, int] = {ing: bit for bit, (ing, _) in enumerate(frequency.most_common())}
+        self.words = max(1, (len(self.bit_of) + 63) // 64)
+        self._tiebreak = list(tiebreak) if tiebreak is not None else [0.0] * len(self.recipe_ids)
+
+        self._vectorized = np is not None
+        if self._vectorized:
+            words, columns, values = [], [], []
+            for column, ingredients in enumerate(ingredient_sets):
+                for ing in ingredients:
+                    bit = self.bit_of[ing]
+                    words.append(bit >> 6)
+                    columns.append(column)
+                    values.append(1 << (bit & 63))
+            # Word-major: row w holds bits 64w..64w+63 of every recipe
+            self._matrix = np.zeros((self.words, len(ingredient_sets)), dtype=np.uint64)
+            np.bitwise_or.at(
+                self._matrix,
+                (np.array(words, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                np.array(values, dtype=np.uint64)
+            )
+            self._tiebreak_array = np.array(self._tiebreak, dtype=np.float64)
+        else:
+            self._masks = [self._int_mask(ingredients) for ingredients in ingredient_sets]
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def _int_mask(self, ingredients: Iterable[str]) -> int:
+        mask = 0
+        for ing in ingredients:
+            bit = self.bit_of.get(ing)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def _array_mask(self, ingredients: Iterable[str]) -> "np.ndarray":
+        mask = np.zeros(self.words, dtype=np.uint64)
+        for ing in ingredients:
+            bit = self.bit_of.get(ing)
+            if bit is not None:
+                mask[bit >> 6] |= np.uint64(1 << (bit & 63))
+        return mask
+
+    def rank(self, pantry: Iterable[str], limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Feasible recipes for a pantry (canonical ingredients; unknown ones are ignored)
+        as (recipe_id, coverage), highest coverage first, then lowest tiebreak.
+        """
+        if not self.recipe_ids:
+            return []
+
+        if self._vectorized:
+            pantry_mask = self._array_mask(pantry)
+            missing_mask = ~pantry_mask
+            # OR together each recipe's out-of-pantry bits, one contiguous word-row at a time
+            missing = np.zeros(len(self.recipe_ids), dtype=np.uint64)
+            scratch = np.empty_like(missing)
+            for word in range(self.words):
+                np.bitwise_and(self._matrix[word], missing_mask[word], out=scratch)
+                np.bitwise_or(missing, scratch, out=missing)
+            feasible = np.flatnonzero(missing == 0)
+            coverage = _popcount_columns(self._matrix[:, feasible] & pantry_mask[:, None])
+            # lexsort: last key is primary
+            order = np.lexsort((feasible, self._tiebreak_array[feasible], -coverage))[:limit]
+            return [
+                (self.recipe_ids[column], covered)
+                for column, covered in zip(feasible[order].tolist(), coverage[order].tolist())
+            ]
+
+        pantry_mask = self._int_mask(pantry)
+        missing_mask = ~pantry_mask
+        feasible = [
+            (row, (mask & pantry_mask).bit_count())
+            for row, mask in enumerate(self._masks)
+            if not mask & missing_mask
+        ]
+        feasible.sort(key=lambda item: (-item[1], self._tiebreak[item[0]], item[0]))
+        if limit is not None:
+            feasible = feasible[:limit]
+        return [(self.recipe_ids[row], coverage) for row, coverage in feasible]
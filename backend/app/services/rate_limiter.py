@@ -0,0 +1,136 @@
+"""
+Rate Limiter - Process-wide token buckets for upstream APIs
+
+One bucket per provider (Gemini, Spoonacular, OpenAI, Open Food Facts), shared
+by every caller in the process. A call takes a token before it goes out and
+waits if the bucket is empty, so bursts are smoothed to the provider's quota
+instead of turning into 429s.
+
+When a provider does answer 429, report it with throttled(): the bucket is
+drained (for Retry-After seconds if given) so everyone backs off together,
+instead of each caller retrying into the same wall.
+
+Callers await acquire(); the bucket state is lock-protected so stats() and
+throttled() are safe from any thread.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from ..config import settings
+
+# Provider names
+GEMINI = "gemini"
+SPOONACULAR = "spoonacular"
+OPENAI = "openai"
+OPEN_FOOD_FACTS = "open_food_facts"
+
+# Back-off when a 429 comes without a Retry-After header
+DEFAULT_THROTTLE_SECONDS = 5.0
+
+
+class TokenBucket:
+    """Classic token bucket; tokens may go negative to queue callers in arrival order"""
+
+    def __init__(self, name: str, rate_per_second: float, burst: int = 1):
+        self.name = name
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._acquired = 0
+        self._waited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._throttled = 0
+
+    def _reserve(self) -> float:
+        """Take a token now (possibly on credit); return how long to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def _record(self, delay: float) -> None:
+        with self._lock:
+            self._acquired += 1
+            if delay > 0:
+                self._waited += 1
+                self._total_wait += delay
+                self._max_wait = max(self._max_wait, delay)
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        self._record(delay)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """Upstream said 429: hold every caller back for retry_after seconds"""
+        pause = retry_after if retry_after is not None else DEFAULT_THROTTLE_SECONDS
+        with self._lock:
+            self._throttled += 1
+            if self.rate > 0:
+                self._tokens = min(self._tokens, 0.0) - pause * self.rate
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.capacity,
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "throttled": self._throttled,
+                "total_wait_seconds": self._total_wait,
+                "avg_wait_seconds": self._total_wait / self._acquired if self._acquired else 0.0,
+                "max_wait_seconds": self._max_wait,
+            }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header (seconds form) -> float, or None"""
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Registry of per-provider buckets"""
+
+    def __init__(self, limits: Dict[str, tuple]):
+        # limits: provider -> (requests_per_minute, burst); <= 0 requests_per_minute disables limiting
+        self._buckets = {
+            provider: TokenBucket(provider, per_minute / 60.0, burst)
+            for provider, (per_minute, burst) in limits.items()
+        }
+
+    def bucket(self, provider: str) -> TokenBucket:
+        return self._buckets[provider]
+
+    async def acquire(self, provider: str) -> None:
+        await self._buckets[provider].acquire()
+
+    def throttled(self, provider: str, retry_after: Optional[float] = None) -> None:
+        self._buckets[provider].throttled(retry_after)
+
+    def stats(self) -> Dict:
+        return {provider: bucket.stats() for provider, bucket in self._buckets.items()}
+
+
+# Singleton instance
+rate_limiter = RateLimiter({
+    GEMINI: (settings.RATE_LIMIT_GEMINI_PER_MINUTE, settings.RATE_LIMIT_GEMINI_BURST),
+    SPOONACULAR: (settings.RATE_LIMIT_SPOONACULAR_PER_MINUTE, settings.RATE_LIMIT_SPOONACULAR_BURST),
+    OPENAI: (settings.RATE_LIMIT_OPENAI_PER_MINUTE, settings.RATE_LIMIT_OPENAI_BURST),
+    OPEN_FOOD_FACTS: (settings.RATE_LIMIT_OPEN_FOOD_FACTS_PER_MINUTE, settings.RATE_LIMIT_OPEN_FOOD_FACTS_BURST),
+})
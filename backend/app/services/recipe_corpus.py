@@ -0,0 +1,397 @@
+"""
+Recipe Corpus - Local recipes ranked against a user's pantry
+
+Recipes imported from a JSONL dump (see import_recipe_corpus.py) are stored in
+corpus_recipes, with an inverted index corpus_recipe_ingredients mapping each
+canonical ingredient to the recipes that need it. "Which recipes can I make?"
+is then a single indexed query: join on the pantry's ingredients and keep the
+recipes whose matched count equals their ingredient_count.
+
+Pantry names are resolved against the corpus vocabulary with the same rule as
+the recipe validator, on whole words: "large eggs" covers "egg", and "rice"
+covers "jasmine rice". Water and salt are always available.
+
+For the suggestion and swap fallbacks the whole corpus is also held in memory
+as ingredient bitsets (see pantry_bitset.py), so ranking every recipe against a
+pantry is one vectorized pass instead of a query.
+
+Used by /too-tired and as the suggestion fallback when Gemini is slow or down.
+"""
+
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.recipe import CorpusRecipe, CorpusRecipeIngredient
+from .ingredient_matcher import STAPLES
+from .pantry_bitset import PantryBitsetIndex
+
+# Spoonacular-style boolean flags -> DietaryRestriction values
+_DIET_FLAGS = {
+    "glutenFree": "gluten_free",
+    "dairyFree": "dairy_free",
+    "vegetarian": "vegetarian",
+    "vegan": "vegan",
+}
+
+# Spoonacular "diets" labels -> DietaryRestriction values (labels without one are dropped)
+_DIET_LABELS = {
+    "gluten free": "gluten_free",
+    "dairy free": "dairy_free",
+    "vegetarian": "vegetarian",
+    "lacto ovo vegetarian": "vegetarian",
+    "lacto vegetarian": "vegetarian",
+    "ovo vegetarian": "vegetarian",
+    "vegan": "vegan",
+    "ketogenic": "keto",
+    "keto": "keto",
+    "low carb": "low_carb",
+}
+
+_NON_WORD = re.compile(r"[^a-z]+")
+
+# Reload the in-memory corpus index this often (picks up imports from other processes)
+_INDEX_MAX_AGE_SECONDS = 60 * 60
+
+
+def canonical_ingredient(name: str) -> str:
+    """Lowercase, strip punctuation/digits and singularize each word: 'Large Eggs' -> 'large egg'"""
+    words = _NON_WORD.sub(" ", (name or "").lower()).split()
+    return " ".join(_singular(w) for w in words)
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _word_ngrams(canonical: str) -> Set[str]:
+    """Every run of consecutive words: 'extra virgin olive oil' -> {'olive oil', 'oil', ...}"""
+    words = canonical.split()
+    return {
+        " ".join(words[start:end])
+        for start in range(len(words))
+        for end in range(start + 1, len(words) + 1)
+    }
+
+
+class _Vocabulary:
+    """In-memory view of the corpus' canonical ingredients for resolving pantry names"""
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = frozenset(terms)
+        # word n-gram -> vocabulary terms containing it (for "rice" covering "jasmine rice")
+        self.containing: Dict[str, Set[str]] = {}
+        for term in self.terms:
+            for gram in _word_ngrams(term):
+                self.containing.setdefault(gram, set()).add(term)
+
+    def resolve(self, pantry_names: Iterable[str]) -> Set[str]:
+        """Corpus ingredients covered by the pantry (plus staples)"""
+        covered = {canonical_ingredient(s) for s in STAPLES}
+        for name in pantry_names:
+            canonical = canonical_ingredient(name)
+            if not canonical:
+                continue
+            # Vocabulary terms inside the pantry name ("large egg" covers "egg")
+            covered.update(gram for gram in _word_ngrams(canonical) if gram in self.terms)
+            # Vocabulary terms containing the pantry name ("rice" covers "jasmine rice")
+            covered.update(self.containing.get(canonical, ()))
+        return covered
+
+
+class _CorpusIndex:
+    """Everything the in-memory ranking needs: vocabulary, bitsets and per-recipe filters"""
+
+    def __init__(self, db: Session):
+        ingredients_by_recipe: Dict[int, List[str]] = {}
+        for recipe_id, ingredient in db.query(CorpusRecipeIngredient.recipe_id, CorpusRecipeIngredient.ingredient):
+            ingredients_by_recipe.setdefault(recipe_id, []).append(ingredient)
+
+        recipes = db.query(
+            CorpusRecipe.id, CorpusRecipe.name, CorpusRecipe.ready_in_minutes, CorpusRecipe.diets
+        ).order_by(CorpusRecipe.id).all()
+        recipes = [r for r in recipes if r.id in ingredients_by_recipe]
+
+        self.vocabulary = _Vocabulary(ing for ings in ingredients_by_recipe.values() for ing in ings)
+        self.bitsets = PantryBitsetIndex(
+            [(r.id, ingredients_by_recipe[r.id]) for r in recipes],
+            tiebreak=[r.ready_in_minutes for r in recipes]
+        )
+        self.names = {r.id: r.name.lower() for r in recipes}
+        self.diets = {r.id: r.diets for r in recipes}
+        self.loaded_at = time.monotonic()
+
+
+_index: Optional[_CorpusIndex] = None
+_index_lock = threading.Lock()
+
+
+def _get_index(db: Session) -> _CorpusIndex:
+    global _index
+    with _index_lock:
+        if _index is None or time.monotonic() - _index.loaded_at > _INDEX_MAX_AGE_SECONDS:
+            _index = _CorpusIndex(db)
+        return _index
+
+
+def invalidate_index() -> None:
+    """Call after the corpus changes"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def resolve_pantry(db: Session, available_ingredients: Iterable[str]) -> Set[str]:
+    """Canonical corpus ingredients the user can cook with"""
+    return _get_index(db).vocabulary.resolve(available_ingredients)
+
+
+# ===== QUERIES =====
+
+def find_cookable_recipes(
+    db: Session,
+    available_ingredients: List[str],
+    dietary_restrictions: Optional[List[str]] = None,
+    max_ingredients: Optional[int] = None,
+    max_ready_minutes: Optional[int] = None,
+    exclude_names: Optional[Iterable[str]] = None,
+    quickest_first: bool = False,
+    limit: int = 10
+) -> List[Dict]:
+    """
+    Corpus recipes made entirely from the user's pantry, satisfying every dietary restriction.
+    Ranked by most ingredients used (fullest meal), or with quickest_first by
+    ready time then fewest ingredients.
+    """
+    pantry = resolve_pantry(db, available_ingredients)
+    if not pantry:
+        return []
+
+    q = db.query(CorpusRecipe).join(
+        CorpusRecipeIngredient, CorpusRecipeIngredient.recipe_id == CorpusRecipe.id
+    ).filter(CorpusRecipeIngredient.ingredient.in_(pantry))
+
+    if max_ingredients is not None:
+        q = q.filter(CorpusRecipe.ingredient_count <= max_ingredients)
+    if max_ready_minutes is not None:
+        q = q.filter(CorpusRecipe.ready_in_minutes <= max_ready_minutes)
+    for restriction in dietary_restrictions or []:
+        q = q.filter(CorpusRecipe.diets.contains(f",{restriction},"))
+
+    excluded = {n.lower() for n in exclude_names or ()}
+    if excluded:
+        q = q.filter(func.lower(CorpusRecipe.name).notin_(excluded))
+
+    # Every ingredient of the recipe matched the pantry
+    q = q.group_by(CorpusRecipe.id).having(
+        func.count(CorpusRecipeIngredient.ingredient) == CorpusRecipe.ingredient_count
+    )
+
+    if quickest_first:
+        q = q.order_by(CorpusRecipe.ready_in_minutes, CorpusRecipe.ingredient_count, CorpusRecipe.id)
+    else:
+        q = q.order_by(CorpusRecipe.ingredient_count.desc(), CorpusRecipe.ready_in_minutes, CorpusRecipe.id)
+
+    return [corpus_recipe_to_dict(r) for r in q.limit(limit).all()]
+
+
+def rank_cookable_recipes(
+    db: Session,
+    available_ingredients: List[str],
+    dietary_restrictions: Optional[List[str]] = None,
+    exclude_names: Optional[Iterable[str]] = None,
+    limit: int = 10
+) -> List[Dict]:
+    """
+    Same answer as find_cookable_recipes (default ranking: most ingredients used, then
+    quickest), computed over the in-memory bitset index; only the winners are loaded.
+    """
+    index = _get_index(db)
+    pantry = index.vocabulary.resolve(available_ingredients)
+    tags = [f",{restriction}," for restriction in dietary_restrictions or []]
+    excluded = {n.lower() for n in exclude_names or ()}
+
+    chosen = []
+    for recipe_id, _coverage in index.bitsets.rank(pantry):
+        if index.names[recipe_id] in excluded:
+            continue
+        if any(tag not in index.diets[recipe_id] for tag in tags):
+            continue
+        chosen.append(recipe_id)
+        if len(chosen) >= limit:
+            break
+    if not chosen:
+        return []
+
+    rows = {r.id: r for r in db.query(CorpusRecipe).filter(CorpusRecipe.id.in_(chosen))}
+    return [corpus_recipe_to_dict(rows[recipe_id]) for recipe_id in chosen if recipe_id in rows]
+
+
+def corpus_recipe_to_dict(recipe: CorpusRecipe) -> Dict:
+    """Corpus row in the recipe dict shape used by the recipe service (RecipeResponse)"""
+    return {
+        "recipe_id": f"corpus_{recipe.external_id}",
+        "name": recipe.name,
+        "servings": recipe.servings,
+        "ready_in_minutes": recipe.ready_in_minutes,
+        "image_url": recipe.image_url,
+        "calories_per_serving": recipe.calories_per_serving,
+        "protein_per_serving": recipe.protein_per_serving,
+        "carbs_per_serving": recipe.carbs_per_serving,
+        "fat_per_serving": recipe.fat_per_serving,
+        "ingredients": recipe.ingredients,
+        "steps": recipe.steps,
+        "source": "local_corpus",
+        "spoonacular_url": recipe.source_url,
+    }
+
+
+# ===== IMPORT =====
+
+def normalize_record(record: Dict) -> Optional[Dict]:
+    """
+    One JSONL record -> column values, or None if unusable.
+    Accepts our own RecipeResponse shape as well as Spoonacular-style keys
+    (title, readyInMinutes, extendedIngredients, analyzedInstructions, nutrition).
+    """
+    external_id = record.get("id", record.get("recipe_id"))
+    name = record.get("name") or record.get("title")
+    ready = record.get("ready_in_minutes", record.get("readyInMinutes"))
+    if external_id is None or not name or ready is None:
+        return None
+
+    ingredients = []
+    for ing in record.get("ingredients") or record.get("extendedIngredients") or []:
+        if isinstance(ing, str):
+            ing = {"name": ing}
+        ing_name = ing.get("name") or ing.get("nameClean")
+        if not ing_name:
+            continue
+        ingredients.append({
+            "name": ing_name,
+            "amount": ing.get("amount"),
+            "unit": ing.get("unit"),
+        })
+    canonical = sorted({canonical_ingredient(i["name"]) for i in ingredients} - {""})
+    if not canonical:
+        return None
+
+    steps = record.get("steps")
+    if steps is None:
+        steps = [
+            step.get("step")
+            for block in record.get("analyzedInstructions") or []
+            for step in block.get("steps", [])
+            if step.get("step")
+        ]
+
+    macros = _record_macros(record)
+
+    diets = {
+        _DIET_LABELS[label]
+        for label in (str(d).lower().replace("_", " ").strip() for d in record.get("diets") or [])
+        if label in _DIET_LABELS
+    }
+    diets.update(value for flag, value in _DIET_FLAGS.items() if record.get(flag))
+
+    return {
+        "external_id": str(external_id),
+        "name": name,
+        "servings": record.get("servings") or 1,
+        "ready_in_minutes": int(ready),
+        "ingredient_count": len(canonical),
+        "ingredients": ingredients,
+        "steps": steps,
+        "diets": "," + ",".join(sorted(diets)) + ",",
+        "image_url": record.get("image_url") or record.get("image"),
+        "source_url": record.get("source_url") or record.get("sourceUrl"),
+        "canonical_ingredients": canonical,
+        **macros,
+    }
+
+
+def _record_macros(record: Dict) -> Dict:
+    macros = {
+        "calories_per_serving": record.get("calories_per_serving"),
+        "protein_per_serving": record.get("protein_per_serving"),
+        "carbs_per_serving": record.get("carbs_per_serving"),
+        "fat_per_serving": record.get("fat_per_serving"),
+    }
+    # Spoonacular: nutrition.nutrients = [{"name": "Calories", "amount": 230, ...}, ...]
+    nutrients = {
+        n.get("name", "").lower(): n.get("amount")
+        for n in (record.get("nutrition") or {}).get("nutrients", [])
+    }
+    for key, nutrient in (
+        ("calories_per_serving", "calories"),
+        ("protein_per_serving", "protein"),
+        ("carbs_per_serving", "carbohydrates"),
+        ("fat_per_serving", "fat"),
+    ):
+        if macros[key] is None:
+            macros[key] = nutrients.get(nutrient)
+    return {k: float(v or 0) for k, v in macros.items()}
+
+
+def import_recipes(db: Session, records: Iterable[Dict], batch_size: int = 500) -> Dict:
+    """
+    Upsert recipes (by external id) and their inverted-index rows, committing per batch.
+    Returns {"imported": n, "skipped": n}.
+    """
+    imported = 0
+    skipped = 0
+    batch = []
+
+    for record in records:
+        row = normalize_record(record)
+        if row is None:
+            skipped += 1
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            imported += _import_batch(db, batch)
+            batch = []
+    if batch:
+        imported += _import_batch(db, batch)
+
+    invalidate_index()
+    return {"imported": imported, "skipped": skipped}
+
+
+def _import_batch(db: Session, rows: List[Dict]) -> int:
+    # Last record wins if the dump repeats an id within a batch
+    rows = list({row["external_id"]: row for row in rows}.values())
+    existing = {
+        r.external_id: r for r in db.query(CorpusRecipe).filter(
+            CorpusRecipe.external_id.in_([row["external_id"] for row in rows])
+        )
+    }
+
+    for row in rows:
+        canonical = row.pop("canonical_ingredients")
+        recipe = existing.get(row["external_id"])
+        if recipe is None:
+            recipe = CorpusRecipe(**row)
+            db.add(recipe)
+            db.flush()
+            existing[recipe.external_id] = recipe
+        else:
+            for key, value in row.items():
+                setattr(recipe, key, value)
+            db.query(CorpusRecipeIngredient).filter(CorpusRecipeIngredient.recipe_id == recipe.id).delete()
+        db.add_all(CorpusRecipeIngredient(ingredient=ing, recipe_id=recipe.id) for ing in canonical)
+
+    db.commit()
+    return len(rows)
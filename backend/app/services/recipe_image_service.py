@@ -1,12 +1,22 @@
+import asyncio
 import os
-import httpx
+import time
 import urllib.parse
-from typing import Optional
+from typing import Dict, List, Optional
+
+from ..config import settings
+from .rate_limiter import rate_limiter, parse_retry_after, OPENAI, SPOONACULAR
+from .http_clients import HTTPClients, http_clients
+from .image_cache import image_cache, image_cache_key, NEGATIVE
+from .single_flight import SingleFlight
 
 try:
-    from openai import OpenAI
+    from openai import RateLimitError
 except ImportError:
-    OpenAI = None
+    RateLimitError = None
+
+# Host of the keyless fallback photos (placeholder_image_url)
+PLACEHOLDER_IMAGE_HOST = "loremflickr.com"
 
 
 def build_image_prompt(recipe_name: str) -> str:
@@ -20,66 +30,243 @@ def build_image_prompt(recipe_name: str) -> str:
     )
 
 
-def generate_recipe_image_url(recipe_name: str) -> Optional[str]:
+async def generate_recipe_image_url(recipe_name: str, http: Optional[HTTPClients] = None) -> Optional[str]:
     """
     Generate or search for a recipe image.
-    1. Try OpenAI DALL-E 3 if key is present.
-    2. Fallback to Spoonacular search if key is present.
-    3. Fallback to a reliable image placeholder service (Lorem Flickr).
+    OpenAI DALL-E 3 and Spoonacular search (whichever have keys) are raced in parallel
+    (see find_recipe_image); a reliable placeholder (Lorem Flickr) is the last resort.
+
+    Results are cached by normalized name (see image_cache.py), so a dish is only
+    sent to the paid APIs once per TTL; concurrent misses for the same name share one race.
+    Uses the shared keep-alive clients (see http_clients.py).
     """
-    # 1. Try OpenAI
-    openai_key = os.getenv("OPENAI_API_KEY")
-    if openai_key and OpenAI:
+    try:
+        cached = await asyncio.to_thread(image_cache.get, recipe_name)
+    except Exception as e:
+        print(f"Image cache read error: {e}")
+        cached = None
+    if cached is not None:
+        return cached.url
+
+    async def find_and_cache() -> str:
+        url, provider = await find_recipe_image(recipe_name, http or http_clients)
         try:
-            client = OpenAI(api_key=openai_key)
-            resp = client.images.generate(
-                model="dall-e-3",
-                prompt=build_image_prompt(recipe_name),
-                n=1,
-                size="1024x1024",
-                quality="standard",
-                style="natural",
-            )
-            if resp.data:
-                return resp.data[0].url
+            await asyncio.to_thread(image_cache.put, recipe_name, url, provider)
         except Exception as e:
-            print(f"OpenAI Image Error: {e}")
+            print(f"Image cache write error: {e}")
+        return url
+
+    return await _lookups.do(image_cache_key(recipe_name), find_and_cache)
+
+
+class ProviderStats:
+    """Per-provider win/latency counters for the image provider race"""
+
+    def __init__(self):
+        self.races = 0
+        self.budget_expired = 0
+        self.placeholders = 0
+        self._providers: Dict[str, Dict] = {}
+
+    def _provider(self, provider: str) -> Dict:
+        return self._providers.setdefault(provider, {
+            "attempts": 0, "successes": 0, "failures": 0, "cancelled": 0, "wins": 0,
+            "total_latency_seconds": 0.0, "max_latency_seconds": 0.0,
+        })
+
+    def attempt(self, provider: str) -> None:
+        self._provider(provider)["attempts"] += 1
+
+    def finished(self, provider: str, succeeded: bool, latency: float) -> None:
+        stats = self._provider(provider)
+        stats["successes" if succeeded else "failures"] += 1
+        stats["total_latency_seconds"] += latency
+        stats["max_latency_seconds"] = max(stats["max_latency_seconds"], latency)
+
+    def cancelled(self, provider: str) -> None:
+        self._provider(provider)["cancelled"] += 1
+
+    def won(self, provider: str) -> None:
+        self._provider(provider)["wins"] += 1
+
+    def stats(self) -> Dict:
+        providers = {}
+        for provider, stats in self._providers.items():
+            completed = stats["successes"] + stats["failures"]
+            providers[provider] = {
+                **stats,
+                "avg_latency_seconds": stats["total_latency_seconds"] / completed if completed else 0.0,
+            }
+        return {
+            "policy": settings.IMAGE_PROVIDER_POLICY,
+            "order": settings.IMAGE_PROVIDER_ORDER,
+            "budget_seconds": settings.IMAGE_PROVIDER_BUDGET_SECONDS,
+            "races": self.races,
+            "budget_expired": self.budget_expired,
+            "placeholders": self.placeholders,
+            "providers": providers,
+        }
+
+
+# Singletons
+provider_stats = ProviderStats()
+_lookups = SingleFlight()
+
+
+async def find_recipe_image(recipe_name: str, http: HTTPClients) -> tuple[str, str]:
+    """
+    Uncached hedged provider race; returns (url, provider), provider NEGATIVE for the placeholder.
+
+    Every configured provider starts at once, so a slow or failing one no longer adds its
+    full timeout before the next is tried. The result follows IMAGE_PROVIDER_POLICY:
+    - "preferred": the first provider in IMAGE_PROVIDER_ORDER that succeeds, returned as
+      soon as every provider ranked above it has failed (or the budget runs out)
+    - "fastest": the first provider to succeed
+    Whatever is still running when the result is chosen is cancelled.
+    """
+    calls = {OPENAI: _openai_image, SPOONACULAR: _spoonacular_image}
+    order = [
+        provider for provider in settings.IMAGE_PROVIDER_ORDER
+        if provider in calls and _provider_configured(provider, http)
+    ]
+    provider_stats.races += 1
+    if not order:
+        provider_stats.placeholders += 1
+        return placeholder_image_url(recipe_name), NEGATIVE
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.IMAGE_PROVIDER_BUDGET_SECONDS
+    tasks = {
+        asyncio.create_task(_timed_provider_call(provider, calls[provider], recipe_name, http)): provider
+        for provider in order
+    }
+    pending = set(tasks)
+    results: Dict[str, Optional[str]] = {}
+    winner = None
+    try:
+        while pending and winner is None:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                provider_stats.budget_expired += 1
+                break
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                results[tasks[task]] = task.result()
+            winner = _pick_provider(order, results, {tasks[task] for task in pending})
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if winner is None:
+        # Budget spent (or everyone failed): best result in hand, if any
+        winner = next((provider for provider in order if results.get(provider)), None)
+    if winner is None:
+        provider_stats.placeholders += 1
+        return placeholder_image_url(recipe_name), NEGATIVE
+    provider_stats.won(winner)
+    return results[winner], winner
+
+
+def _pick_provider(order: List[str], results: Dict[str, Optional[str]], running: set) -> Optional[str]:
+    """Provider whose result the policy accepts right now, or None to keep waiting"""
+    if settings.IMAGE_PROVIDER_POLICY == "fastest":
+        return next((provider for provider in order if results.get(provider)), None)
+    for provider in order:
+        if provider in running:
+            return None  # a better-ranked provider may still answer
+        if results.get(provider):
+            return provider
+    return None
+
+
+def _provider_configured(provider: str, http: HTTPClients) -> bool:
+    if provider == OPENAI:
+        return http.async_openai_client() is not None
+    return bool(_spoonacular_key())
+
+
+async def _timed_provider_call(provider: str, call, recipe_name: str, http: HTTPClients) -> Optional[str]:
+    """Run one provider, recording latency and outcome; errors count as no result"""
+    provider_stats.attempt(provider)
+    started = time.monotonic()
+    try:
+        url = await call(recipe_name, http)
+    except asyncio.CancelledError:
+        provider_stats.cancelled(provider)
+        raise
+    except Exception as e:
+        print(f"{provider} image error: {e}")
+        url = None
+    provider_stats.finished(provider, succeeded=bool(url), latency=time.monotonic() - started)
+    return url
+
 
-    # 2. Fallback to Spoonacular Search
+async def _openai_image(recipe_name: str, http: HTTPClients) -> Optional[str]:
+    client = http.async_openai_client()
+    await rate_limiter.acquire(OPENAI)
+    try:
+        resp = await client.images.generate(
+            model="dall-e-3",
+            prompt=build_image_prompt(recipe_name),
+            n=1,
+            size="1024x1024",
+            quality="standard",
+            style="natural",
+        )
+    except Exception as e:
+        if RateLimitError is not None and isinstance(e, RateLimitError):
+            rate_limiter.throttled(OPENAI, parse_retry_after(e.response.headers.get("retry-after")))
+        raise
+    return resp.data[0].url if resp.data else None
+
+
+def _spoonacular_key() -> Optional[str]:
     spoon_key = os.getenv("SPOONACULAR_API_KEY")
-    if spoon_key:
-        try:
-            # Clean up key (sometimes it has quotes)
-            spoon_key = spoon_key.replace('"', '').replace("'", "")
-            
-            # Use raw words for search
-            words = recipe_name.lower().replace("recipe", "").replace("dinner", "").split()
-            # Try full name first, then just the first few meaningful words
-            queries = [recipe_name]
-            if len(words) > 2:
-                queries.append(" ".join(words[:3]))
-            
-            with httpx.Client() as client:
-                for q in queries:
-                    resp = client.get(
-                        "https://api.spoonacular.com/recipes/complexSearch",
-                        params={
-                            "query": q,
-                            "number": 1,
-                            "apiKey": spoon_key,
-                            "type": "main course"
-                        },
-                        timeout=5.0
-                    )
-                    if resp.status_code == 200:
-                        results = resp.json().get("results", [])
-                        if results:
-                            img = results[0].get("image")
-                            if img: return img
-        except Exception as e:
-            print(f"Spoonacular Image Error: {e}")
+    # Clean up key (sometimes it has quotes)
+    return spoon_key.replace('"', '').replace("'", "") if spoon_key else None
+
+
+async def _spoonacular_image(recipe_name: str, http: HTTPClients) -> Optional[str]:
+    # Use raw words for search
+    words = recipe_name.lower().replace("recipe", "").replace("dinner", "").split()
+    # Try full name first, then just the first few meaningful words
+    queries = [recipe_name]
+    if len(words) > 2:
+        queries.append(" ".join(words[:3]))
+
+    client = http.async_client()
+    for q in queries:
+        await rate_limiter.acquire(SPOONACULAR)
+        resp = await client.get(
+            "https://api.spoonacular.com/recipes/complexSearch",
+            params={
+                "query": q,
+                "number": 1,
+                "apiKey": _spoonacular_key(),
+                "type": "main course"
+            },
+            timeout=5.0
+        )
+        if resp.status_code == 429:
+            rate_limiter.throttled(SPOONACULAR, parse_retry_after(resp.headers.get("retry-after")))
+            return None
+        if resp.status_code == 200:
+            results = resp.json().get("results", [])
+            if results:
+                img = results[0].get("image")
+                if img: return img
+    return None
+
+
+def is_placeholder_image_url(url: Optional[str]) -> bool:
+    """True for the Lorem Flickr fallback (random per request, so never worth storing)"""
+    return bool(url) and urllib.parse.urlparse(url).hostname == PLACEHOLDER_IMAGE_HOST
+
 
-    # 3. Last Resort: Dynamic high-quality food fallback
+def placeholder_image_url(recipe_name: str) -> str:
+    """Deterministic Lorem Flickr food photo for a recipe name (no API key or quota needed)"""
     # We use a unique seed salt combined with the recipe name to force uniqueness
     import hashlib
     # Increase the seed range and add a random-ish salt that's stable for this recipe name
@@ -91,4 +278,4 @@ def generate_recipe_image_url(recipe_name: str) -> Optional[str]:
     safe_tags = urllib.parse.quote(f"culinary,plating,gourmet,dish,{clean_name.replace(' ', ',')}")
     
     # Use Lorem Flickr with a guaranteed unique lock and higher-quality keyword set
-    return f"https://loremflickr.com/800/800/{safe_tags}?lock={seed}"
+    return f"https://{PLACEHOLDER_IMAGE_HOST}/800/800/{safe_tags}?lock={seed}"
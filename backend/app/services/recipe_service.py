@@ -11,30 +11,65 @@ This service:
 """
 
 import asyncio
+import copy
 import httpx
+import math
 import os
-from typing import Optional, List, Dict, Union
+import time
+import uuid
+from contextlib import aclosing
+from typing import Optional, List, Dict, Union, AsyncIterator, Iterable
 from sqlalchemy.orm import Session
-import google.generativeai as genai
 
 from ..config import settings
-from .recipe_image_service import generate_recipe_image_url
+from ..db import SessionLocal
+from .image_cache import image_cache
+from .image_jobs import DONE, ImageJob, image_jobs, render_recipe_image
+from .image_store import image_store
+from .recipe_image_service import is_placeholder_image_url, placeholder_image_url
+from .suggestion_cache import suggestion_cache, inventory_fingerprint
+from .ingredient_matcher import IngredientMatcher
+from .llm_client import LLMClient, llm_client
+from .recipe_stream_parser import RecipeStreamParser
+from .single_flight import SingleFlight
+from . import recipe_corpus
 
 # Initialize APIs
 SPOONACULAR_API_KEY = settings.SPOONACULAR_API_KEY
 SPOONACULAR_BASE_URL = "https://api.spoonacular.com"
 
+# Marks the end of a suggestion stream on the internal ready-queue
+_END_OF_SUGGESTIONS = object()
+
+# Marks one speculative Gemini call finishing on its arrivals queue
+_CALL_FINISHED = object()
+
+# Gemini calls allowed per suggestions request (serial retries or speculative calls)
+MAX_GENERATION_ATTEMPTS = 5
+
+# Weight of the latest recipe in the rejection-rate moving average
+REJECTION_RATE_SMOOTHING = 0.1
+
 
 class RecipeService:
-    def __init__(self):
-        # Configure Gemini
-        gemini_api_key = settings.GEMINI_API_KEY
-        if gemini_api_key:
-            genai.configure(api_key=gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-flash-latest')
-        else:
-            self.model = None
-            print("WARNING: GEMINI_API_KEY not found. Recipe generation will fail.")
+    def __init__(self, llm: Optional[LLMClient] = None):
+        # Gemini access (async, bounded, timed) - see llm_client.py
+        self.llm = llm or llm_client
+
+        # Caps concurrent DALL-E/Spoonacular calls across all in-flight requests
+        self._image_semaphore = asyncio.Semaphore(max(1, settings.RECIPE_IMAGE_CONCURRENCY))
+
+        # Moving average of the fraction of generated recipes we throw away
+        self._rejection_rate = 0.0
+
+        # Coalesces concurrent get_suggestions calls for the same user + inventory + allergens + count
+        self._suggestion_flights = SingleFlight()
+
+        # Generations still draining extra recipes into the swap pool after delivering their results
+        self._draining: set = set()
+
+        # Deferred pool images waiting to be written back to their stored recipes
+        self._image_writebacks: set = set()
 
     async def get_daily_suggestion(
             self,
@@ -61,77 +96,634 @@ class RecipeService:
         Uses recursive verification to ensure 100% inventory compliance.
         """
         try:
-            # 1. Get user constraints
-            if allergens_override is not None:
-                allergens = list(allergens_override)
-                _, available_ingredients = await self._get_user_context(user_id, db)
+            allergens, available_ingredients = await self.get_suggestion_inputs(user_id, db, allergens_override)
+
+            async def collect() -> List[Dict]:
+                return [
+                    recipe async for recipe in self.iter_suggestions(user_id, allergens, available_ingredients, count)
+                ]
+
+            # Double taps / app + web at once: identical concurrent requests share one pipeline run
+            flight_key = (user_id, inventory_fingerprint(available_ingredients, allergens), count)
+            recipes = await self._suggestion_flights.do(flight_key, collect)
+            return copy.deepcopy(recipes)
+        except Exception as e:
+            print(f"Error in get_suggestions: {e}")
+            return []
+
+    def suggestion_flight_stats(self) -> Dict:
+        return self._suggestion_flights.stats()
+
+    async def get_suggestion_inputs(
+            self,
+            user_id: int,
+            db: Session,
+            allergens_override: Optional[List[str]] = None
+    ) -> tuple[List[str], List[str]]:
+        """Resolve (allergens, available_ingredients) for a user, honouring an explicit allergen override."""
+        if allergens_override is not None:
+            _, available_ingredients = await self._get_user_context(user_id, db)
+            return list(allergens_override), available_ingredients
+        return await self._get_user_context(user_id, db)
+
+    async def iter_suggestions(
+            self,
+            user_id: int,
+            allergens: List[str],
+            available_ingredients: List[str],
+            count: int = 4,
+            source: str = "live",
+            use_stored: bool = True,
+            exclude_names: Optional[Iterable[str]] = None,
+            defer_images: Optional[bool] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield up to `count` validated recipes, each one as soon as its image is ready.
+        Takes resolved inputs (see get_suggestion_inputs) so it never touches the DB session.
+        With deferred images (default: RECIPE_DEFER_IMAGES) recipes are yielded as soon as they
+        validate, with a placeholder image_url and an image_job_id to poll for the real one.
+
+        Lookup order: in-process cache -> persisted suggestion store -> live generation,
+        topped up from the local recipe corpus if generation comes back short or runs past
+        RECIPE_GENERATION_BUDGET_SECONDS.
+        use_stored=False goes straight to live generation (and doesn't overwrite the cache/store);
+        generated recipes named in exclude_names are skipped.
+        """
+        inventory_version = inventory_fingerprint(available_ingredients, allergens)
+        cache_key = suggestion_cache.make_key(user_id, inventory_version, count)
+        if defer_images is None:
+            defer_images = settings.RECIPE_DEFER_IMAGES
+
+        if use_stored:
+            # Unchanged pantry + allergens + count: serve the previous result
+            cached = suggestion_cache.get(cache_key)
+            if cached is not None:
+                print(f"DEBUG: Suggestion cache hit for user {user_id}")
+                await self._resolve_deferred_images(cached)
+                await self._refresh_images(cached, defer_images)
+                for recipe in cached:
+                    yield recipe
+                return
+
+            # Precomputed (or another process's) suggestions for this inventory version
+            stored = await asyncio.to_thread(self._load_stored_suggestions, user_id, inventory_version, count)
+            if stored is not None:
+                print(f"DEBUG: Suggestion store hit for user {user_id}")
+                # Precomputed at night: their DALL-E links have long expired by dinner time
+                await self._resolve_deferred_images(stored)
+                await self._refresh_images(stored, defer_images)
+                suggestion_cache.set(cache_key, user_id, stored)
+                for recipe in stored:
+                    yield recipe
+                return
+
+        ready: asyncio.Queue = asyncio.Queue()
+        image_tasks: List[asyncio.Task] = []
+        producer = asyncio.create_task(
+            self._generate_valid_recipes(
+                user_id, inventory_version, allergens, available_ingredients, count, ready, image_tasks,
+                exclude_names=exclude_names, defer_images=defer_images
+            )
+        )
+        delivered = []
+        finished = False
+        budget = settings.RECIPE_GENERATION_BUDGET_SECONDS
+        deadline = asyncio.get_running_loop().time() + budget if budget > 0 else None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - asyncio.get_running_loop().time())
+                try:
+                    item = await asyncio.wait_for(ready.get(), timeout)
+                except asyncio.TimeoutError:
+                    # Gemini is slow (or retrying): stop waiting and fill the rest from the corpus
+                    print(f"DEBUG: Generation budget of {budget}s spent with {len(delivered)}/{count} recipes")
+                    producer.cancel()
+                    for task in image_tasks:
+                        task.cancel()
+                    break
+                if item is _END_OF_SUGGESTIONS:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                delivered.append(item)
+                yield item
+            finished = True
+
+            if len(delivered) < count and settings.RECIPE_CORPUS_FALLBACK:
+                excluded = [r["name"] for r in delivered] + list(exclude_names or ())
+                for recipe in await self._corpus_fallback(allergens, available_ingredients, count - len(delivered), excluded):
+                    yield recipe
+
+            if delivered and use_stored:
+                suggestion_cache.set(cache_key, user_id, delivered)
+                await asyncio.to_thread(self._save_stored_suggestions, user_id, inventory_version, delivered, source)
+        finally:
+            if finished:
+                # Results delivered: let the producer collect the pool extras (bounded) and save the pool
+                self._draining.add(producer)
+                producer.add_done_callback(self._draining.discard)
+            else:
+                # Consumer went away early (client disconnect) or failed: stop paying for work
+                producer.cancel()
+                for task in image_tasks:
+                    task.cancel()
+
+    async def precompute_suggestions(self, user_id: int, db: Session, count: int = 4) -> bool:
+        """
+        Off-peak job entry point: make sure the store holds `count` fresh suggestions for the
+        user's current inventory version. Returns True if new suggestions were generated.
+        """
+        allergens, available_ingredients = await self.get_suggestion_inputs(user_id, db)
+        inventory_version = inventory_fingerprint(available_ingredients, allergens)
+        if await asyncio.to_thread(self._load_stored_suggestions, user_id, inventory_version, count) is not None:
+            return False
+
+        recipes = [
+            recipe async for recipe in self.iter_suggestions(
+                user_id, allergens, available_ingredients, count, source="precompute",
+                defer_images=False  # off-peak: nobody is waiting, store finished images
+            )
+        ]
+        return bool(recipes)
+
+    async def get_swap_alternative(
+            self,
+            user_id: int,
+            db: Session,
+            current_recipe_id: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Next recipe the user hasn't seen for their current inventory, from the stored pool.
+        Only when the pool is exhausted does it fall back to a fresh Gemini generation.
+        """
+        from ..crud import recipe as recipe_crud
+
+        allergens, available_ingredients = await self.get_suggestion_inputs(user_id, db)
+        inventory_version = inventory_fingerprint(available_ingredients, allergens)
+
+        if current_recipe_id:
+            recipe_crud.mark_recipe_seen(db, user_id, current_recipe_id)
+
+        stored = recipe_crud.take_next_unseen_recipe(db, user_id, inventory_version)
+        if stored is not None:
+            print(f"DEBUG: Swap served from recipe pool for user {user_id}")
+            recipe = recipe_crud.stored_recipe_to_dict(stored)
+            if not recipe["image_url"]:
+                # Extras are pooled without images; generate on first serve and keep it
+                if settings.RECIPE_DEFER_IMAGES:
+                    job = await self._defer_image(recipe)
+                    if job is not None:
+                        task = asyncio.create_task(self._store_pool_image(stored.id, job))
+                        self._image_writebacks.add(task)
+                        task.add_done_callback(self._image_writebacks.discard)
+                    elif not is_placeholder_image_url(recipe["image_url"]):
+                        # Already in the image cache
+                        recipe_crud.update_stored_recipe_image(db, stored, recipe["image_url"])
+                else:
+                    await self._attach_image(recipe)
+                    recipe_crud.update_stored_recipe_image(db, stored, recipe["image_url"])
             else:
-                allergens, available_ingredients = await self._get_user_context(user_id, db)
+                # Pooled upstream links may have expired (or been mirrored) since they were stored
+                pooled_url = recipe["image_url"]
+                await self._refresh_images([recipe], settings.RECIPE_DEFER_IMAGES)
+                if recipe["image_url"] != pooled_url and not recipe.get("image_job_id"):
+                    recipe_crud.update_stored_recipe_image(db, stored, recipe["image_url"])
+            return recipe
+
+        # Pool exhausted: generate, skipping everything the user has already been offered
+        print(f"DEBUG: Recipe pool exhausted for user {user_id}, generating")
+        seen_names = recipe_crud.get_pool_recipe_names(db, user_id, inventory_version)
+        recipes = [
+            recipe async for recipe in self.iter_suggestions(
+                user_id, allergens, available_ingredients, count=1,
+                use_stored=False, exclude_names=seen_names
+            )
+        ]
+        return recipes[0] if recipes else None
+
+    def _load_stored_suggestions(self, user_id: int, inventory_version: str, count: int) -> Optional[List[Dict]]:
+        """
+        First `count` stored recipes for this inventory version, or None if missing/stale/too few.
+        Blocking, like the other store/pool helpers below: call them via asyncio.to_thread.
+        """
+        from ..crud import recipe as recipe_crud
+
+        db = SessionLocal()
+        try:
+            stored = recipe_crud.get_stored_suggestions(
+                db, user_id, inventory_version, max_age_hours=settings.SUGGESTION_STORE_MAX_AGE_HOURS
+            )
+            if stored is None or stored.recipe_count < count:
+                return None
+            return stored.recipes[:count]
+        except Exception as e:
+            print(f"Error reading stored suggestions: {e}")
+            return None
+        finally:
+            db.close()
 
-            # 2. Generation Loop (Retry up to 5 times to get valid recipes)
+    def _save_stored_suggestions(
+            self,
+            user_id: int,
+            inventory_version: str,
+            recipes: List[Dict],
+            source: str
+    ) -> None:
+        from ..crud import recipe as recipe_crud
+
+        db = SessionLocal()
+        try:
+            recipe_crud.save_stored_suggestions(db, user_id, inventory_version, recipes, source)
+        except Exception as e:
+            print(f"Error saving stored suggestions: {e}")
+        finally:
+            db.close()
+
+    async def _corpus_fallback(
+            self,
+            allergens: List[str],
+            available_ingredients: List[str],
+            count: int,
+            exclude_names: List[str]
+    ) -> List[Dict]:
+        """
+        Cookable recipes from the local corpus (not cached: the next request retries Gemini).
+        Runs in a worker thread: the ranking, and the hourly index rebuild, are blocking work.
+        """
+        started = time.monotonic()
+        try:
+            recipes = await asyncio.to_thread(
+                self._rank_corpus, allergens, available_ingredients, count, exclude_names
+            )
+        except Exception as e:
+            print(f"Error reading recipe corpus: {e}")
+            return []
+        print(f"DEBUG: Corpus fallback served {len(recipes)} recipes in "
+              f"{(time.monotonic() - started) * 1000:.1f}ms")
+        return recipes
+
+    @staticmethod
+    def _rank_corpus(
+            allergens: List[str],
+            available_ingredients: List[str],
+            count: int,
+            exclude_names: List[str]
+    ) -> List[Dict]:
+        db = SessionLocal()
+        try:
+            return recipe_corpus.rank_cookable_recipes(
+                db, available_ingredients, allergens, exclude_names=exclude_names, limit=count
+            )
+        finally:
+            db.close()
+
+    def _save_recipe_pool(
+            self,
+            user_id: int,
+            inventory_version: str,
+            shown: List[Dict],
+            extras: List[Dict]
+    ) -> None:
+        from ..crud import recipe as recipe_crud
+
+        db = SessionLocal()
+        try:
+            recipe_crud.save_recipe_pool(db, user_id, inventory_version, shown, extras)
+        except Exception as e:
+            print(f"Error saving recipe pool: {e}")
+        finally:
+            db.close()
+
+    async def _generate_valid_recipes(
+            self,
+            user_id: int,
+            inventory_version: str,
+            allergens: List[str],
+            available_ingredients: List[str],
+            count: int,
+            ready: asyncio.Queue,
+            image_tasks: List[asyncio.Task],
+            exclude_names: Optional[Iterable[str]] = None,
+            defer_images: bool = False
+    ) -> None:
+        """
+        Retry loop: generate, validate and start images, pushing each finished recipe onto `ready`.
+        Recipes are validated one by one as Gemini streams them out.
+        Always ends with _END_OF_SUGGESTIONS (or the exception that stopped it).
+
+        Every call asks for RECIPE_POOL_EXTRAS more recipes than it needs. Once `count` are
+        accepted no new Gemini calls start; the ones in flight are read until the extras are in
+        or RECIPE_POOL_FILL_SECONDS pass, then cancelled. Extras go to the swap pool (without images).
+        With defer_images, recipes are pushed right away and their images queued as jobs.
+        """
+        delivery = None
+        try:
             valid_recipes = []
-            max_attempts = 5
+            extras = []
+            seen_names = {name.lower() for name in exclude_names or ()}
             hallucinated_ingredients = set()
-            
-            for attempt in range(max_attempts):
-                missing_count = count - len(valid_recipes)
-                if missing_count <= 0:
-                    break
-                
-                print(f"DEBUG: Recipe generation attempt {attempt + 1}/{max_attempts}")
-                new_results = await self._generate_recipes_with_gemini(
-                    ingredients=available_ingredients,
-                    dietary_restrictions=allergens,
-                    count=missing_count,
-                    forbidden_override=list(hallucinated_ingredients)
+            # Compile the inventory once and reuse it for every recipe and attempt
+            matcher = IngredientMatcher(available_ingredients)
+
+            if settings.RECIPE_SPECULATIVE_GENERATION:
+                candidates = self._speculative_candidates(
+                    available_ingredients, allergens, count, valid_recipes, hallucinated_ingredients, matcher
+                )
+            else:
+                candidates = self._serial_candidates(
+                    available_ingredients, allergens, count, valid_recipes, hallucinated_ingredients, matcher
                 )
-                
-                # Programmatic Validation
-                for recipe in new_results:
-                    # Skip duplicate names
-                    if any(r['name'].lower() == recipe['name'].lower() for r in valid_recipes):
+
+            pool_extras = max(0, settings.RECIPE_POOL_EXTRAS)
+            fill_deadline = None
+            # Closing the candidates stops (and cancels) any generation still in flight
+            async with aclosing(candidates):
+                while True:
+                    recipe = await self._next_candidate(candidates, fill_deadline)
+                    if recipe is None:
+                        break
+                    # Programmatic Validation
+                    # Skip duplicate names (and ones the caller has already offered)
+                    if recipe['name'].lower() in seen_names:
+                        self._record_recipe_outcome(accepted=False)
                         continue
-                        
-                    is_valid, bad_ing = self._is_recipe_valid(recipe, available_ingredients)
+
+                    is_valid, bad_ing = self._is_recipe_valid(recipe, matcher)
+                    self._record_recipe_outcome(accepted=is_valid)
                     if is_valid:
-                        # 3. Generate Image for valid recipes
-                        recipe["image_url"] = await asyncio.to_thread(
-                            generate_recipe_image_url, recipe.get("image_search_keywords") or recipe["name"]
-                        )
+                        seen_names.add(recipe['name'].lower())
+                        if len(valid_recipes) >= count:
+                            extras.append(recipe)
+                            if len(extras) >= pool_extras:
+                                break
+                            continue
+                        if defer_images:
+                            await self._defer_image(recipe)
+                            ready.put_nowait(recipe)
+                        else:
+                            # Start the image as soon as the recipe is accepted so it
+                            # overlaps with the rest of the generation
+                            image_tasks.append(asyncio.create_task(self._attach_image(recipe, ready)))
                         valid_recipes.append(recipe)
+                        if len(valid_recipes) >= count:
+                            # The caller's results no longer depend on the rest of the stream
+                            delivery = asyncio.create_task(self._finish_delivery(image_tasks, ready))
+                            if pool_extras == 0:
+                                break
+                            fill_deadline = asyncio.get_running_loop().time() + settings.RECIPE_POOL_FILL_SECONDS
                     else:
                         print(f"DEBUG: Discarded invalid recipe '{recipe['name']}' due to: {bad_ing}")
                         if bad_ing:
                             hallucinated_ingredients.add(bad_ing)
 
-            return valid_recipes[:count]
+            if delivery is None:
+                await self._finish_delivery(image_tasks, ready)
+            else:
+                await delivery
+        except asyncio.CancelledError:
+            if delivery is not None:
+                delivery.cancel()
+            raise
         except Exception as e:
-            print(f"Error in get_suggestions: {e}")
-            return []
+            if delivery is None:
+                ready.put_nowait(e)
+                return
+            # Failed while draining extras: the caller's results are unaffected
+            print(f"Error draining extra recipes: {e}")
+            await delivery
+        if valid_recipes or extras:
+            await asyncio.to_thread(self._save_recipe_pool, user_id, inventory_version, valid_recipes, extras)
+
+    @staticmethod
+    async def _next_candidate(candidates: AsyncIterator[Dict], deadline: Optional[float]) -> Optional[Dict]:
+        """Next generated recipe; None once the candidates run out or the pool-fill deadline passes."""
+        try:
+            if deadline is None:
+                return await candidates.__anext__()
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return None
+            return await asyncio.wait_for(candidates.__anext__(), timeout=remaining)
+        except (StopAsyncIteration, asyncio.TimeoutError):
+            return None
+
+    @staticmethod
+    async def _finish_delivery(image_tasks: List[asyncio.Task], ready: asyncio.Queue) -> None:
+        await asyncio.gather(*image_tasks)
+        ready.put_nowait(_END_OF_SUGGESTIONS)
 
-    def _is_recipe_valid(self, recipe: Dict, available: List[str]) -> tuple[bool, Optional[str]]:
+    async def _serial_candidates(
+            self,
+            available_ingredients: List[str],
+            allergens: List[str],
+            count: int,
+            valid_recipes: List[Dict],
+            hallucinated_ingredients: set,
+            matcher: IngredientMatcher
+    ) -> AsyncIterator[Dict]:
+        """Generation Loop (Retry up to 5 times to get valid recipes), one Gemini stream at a time."""
+        for attempt in range(MAX_GENERATION_ATTEMPTS):
+            missing_count = count - len(valid_recipes)
+            if missing_count <= 0:
+                return
+
+            print(f"DEBUG: Recipe generation attempt {attempt + 1}/{MAX_GENERATION_ATTEMPTS}")
+            stream = self._stream_recipes_with_gemini(
+                ingredients=available_ingredients,
+                dietary_restrictions=allergens,
+                # Extras in the same prompt fill the swap pool
+                count=min(missing_count + max(0, settings.RECIPE_POOL_EXTRAS), 10),
+                forbidden_override=list(hallucinated_ingredients),
+                matcher=matcher,
+                forbidden_sink=hallucinated_ingredients,
+                needed=missing_count
+            )
+            async with aclosing(stream):
+                async for recipe in stream:
+                    yield recipe
+
+    async def _speculative_candidates(
+            self,
+            available_ingredients: List[str],
+            allergens: List[str],
+            count: int,
+            valid_recipes: List[Dict],
+            hallucinated_ingredients: set,
+            matcher: IngredientMatcher
+    ) -> AsyncIterator[Dict]:
+        """
+        Keep up to RECIPE_SPECULATIVE_FANOUT Gemini streams in flight and yield recipes first-come.
+        Each call over-requests based on the observed rejection rate; later calls pick up the
+        hallucinated_ingredients found so far. Same total budget as the serial loop.
+        Closing the generator cancels whatever is still running.
+        """
+        fanout = max(1, settings.RECIPE_SPECULATIVE_FANOUT)
+        arrivals: asyncio.Queue = asyncio.Queue()
+        launched = 0
+        pending = set()
+
+        async def pump(request_count: int, needed: int) -> None:
+            stream = self._stream_recipes_with_gemini(
+                ingredients=available_ingredients,
+                dietary_restrictions=allergens,
+                count=request_count,
+                forbidden_override=list(hallucinated_ingredients),
+                matcher=matcher,
+                forbidden_sink=hallucinated_ingredients,
+                needed=min(needed, request_count)
+            )
+            async with aclosing(stream):
+                async for recipe in stream:
+                    arrivals.put_nowait(recipe)
+
+        def on_call_done(task: asyncio.Task) -> None:
+            pending.discard(task)
+            arrivals.put_nowait(_CALL_FINISHED)
+
+        try:
+            while True:
+                # Once enough recipes are accepted, stop launching but drain the calls in flight
+                missing_count = count - len(valid_recipes)
+                while missing_count > 0 and len(pending) < fanout and launched < MAX_GENERATION_ATTEMPTS:
+                    launched += 1
+                    request_count = self._over_request_count(missing_count + max(0, settings.RECIPE_POOL_EXTRAS))
+                    print(f"DEBUG: Speculative generation call {launched}/{MAX_GENERATION_ATTEMPTS} "
+                          f"({request_count} recipes)")
+                    task = asyncio.create_task(pump(request_count, missing_count))
+                    pending.add(task)
+                    task.add_done_callback(on_call_done)
+
+                if not pending and arrivals.empty():
+                    return
+
+                item = await arrivals.get()
+                if item is not _CALL_FINISHED:
+                    yield item
+        finally:
+            for task in list(pending):
+                task.cancel()
+
+    def _record_recipe_outcome(self, accepted: bool) -> None:
+        """Fold one generated recipe into the moving-average rejection rate (invalid + duplicates)."""
+        rejected = 0.0 if accepted else 1.0
+        self._rejection_rate = (1 - REJECTION_RATE_SMOOTHING) * self._rejection_rate + REJECTION_RATE_SMOOTHING * rejected
+
+    def _over_request_count(self, missing_count: int) -> int:
+        """How many recipes to ask for so that ~missing_count survive validation."""
+        keep_rate = max(1.0 - self._rejection_rate, 0.25)
+        return min(math.ceil(missing_count / keep_rate), 10)
+
+    async def _attach_image(self, recipe: Dict, ready: Optional[asyncio.Queue] = None) -> None:
+        """
+        Generate the image for one accepted recipe (bounded by the shared semaphore), then mark it ready.
+        The image is mirrored into the local image store in the background; cache and store hits
+        then pick up the local URL, which never expires.
+        """
+        search_query = recipe.get("image_search_keywords") or recipe["name"]
+        async with self._image_semaphore:
+            try:
+                recipe["image_url"], recipe["image_variants"] = await render_recipe_image(search_query)
+            except Exception as e:
+                print(f"Error generating image for '{recipe['name']}': {e}")
+                recipe["image_url"], recipe["image_variants"] = None, None
+        if ready is not None:
+            ready.put_nowait(recipe)
+
+    @staticmethod
+    async def _defer_image(recipe: Dict) -> Optional[ImageJob]:
+        """
+        Use the cached image if there is one, else a placeholder plus a background image job.
+        Returns the job; None for a cached image, or a bare placeholder when the job queue is full.
+        """
+        search_query = recipe.get("image_search_keywords") or recipe["name"]
+        cached = await asyncio.to_thread(image_cache.get, search_query)
+        if cached is not None:
+            recipe["image_url"] = cached.url
+            recipe["image_variants"] = image_store.variants(cached.url)
+            recipe["image_job_id"] = None
+            return None
+        job = image_jobs.submit(search_query)
+        recipe["image_url"] = placeholder_image_url(search_query) if job is None else job.placeholder_url
+        recipe["image_variants"] = None
+        recipe["image_job_id"] = None if job is None else job.job_id
+        return job
+
+    @staticmethod
+    async def _store_pool_image(stored_id: int, job: ImageJob) -> None:
+        """Write a deferred image back to its pooled recipe once the job finishes, so it is served next time."""
+        from ..crud import recipe as recipe_crud
+
+        await job.done.wait()
+        if job.status != DONE or not job.image_url:
+            return
+
+        def write() -> None:
+            db = SessionLocal()
+            try:
+                recipe_crud.set_stored_recipe_image(db, stored_id, job.image_url)
+            finally:
+                db.close()
+
+        try:
+            await asyncio.to_thread(write)
+        except Exception as e:
+            print(f"Error saving pool recipe image: {e}")
+
+    async def _refresh_images(self, recipes: List[Dict], defer_images: bool) -> None:
+        """
+        Re-resolve upstream image URLs on recipes served from the cache or store: they outlive
+        DALL-E links (about an hour). The image cache holds each URL only for its provider's
+        lifetime, so a hit there is still good; a miss means the image is regenerated.
+        Mirrored images and placeholders never expire; mirrored ones only pick up thumbnails
+        encoded since the recipe was stored.
+        """
+        async def refresh(recipe: Dict) -> None:
+            url = recipe.get("image_url")
+            if image_store.is_local(url):
+                recipe["image_variants"] = image_store.variants(url)
+                return
+            if not url or recipe.get("image_job_id") or is_placeholder_image_url(url):
+                return
+            search_query = recipe.get("image_search_keywords") or recipe["name"]
+            cached = await asyncio.to_thread(image_cache.get, search_query)
+            if cached is not None:
+                recipe["image_url"] = cached.url
+                recipe["image_variants"] = image_store.variants(cached.url)
+            elif defer_images:
+                await self._defer_image(recipe)
+            else:
+                await self._attach_image(recipe)
+
+        await asyncio.gather(*(refresh(recipe) for recipe in recipes))
+
+    async def _resolve_deferred_images(self, recipes: List[Dict]) -> None:
+        """Swap finished jobs' images into cached/stored recipes (re-queueing jobs this process lost)."""
+        for recipe in recipes:
+            job_id = recipe.get("image_job_id")
+            if not job_id:
+                continue
+            job = image_jobs.get(job_id)
+            if job is None:
+                await self._defer_image(recipe)
+            elif job.finished:
+                recipe["image_url"] = job.image_url or job.placeholder_url
+                recipe["image_variants"] = job.image_variants
+                recipe["image_job_id"] = None
+
+    def _is_recipe_valid(
+            self,
+            recipe: Dict,
+            available: Union[IngredientMatcher, List[str]]
+    ) -> tuple[bool, Optional[str]]:
         """
         STRICT PROGRAMMATIC CHECK: Does this recipe use items NOT in the user's inventory?
         Returns (is_valid, first_bad_ingredient_name)
+
+        Pass a prebuilt IngredientMatcher to reuse it across recipes and retry attempts.
         """
-        inventory_set = {i.lower().strip() for i in available}
-        # Explicit staples that don't need to be in inventory
-        staples = {"water", "salt"}
-        
-        for ing in recipe.get("ingredients", []):
-            name = ing.get("name", "").lower().strip()
-            if not name: continue
-            if name in staples:
-                continue
-            
-            # Fuzzy match: is this ingredient found in the inventory?
-            # We check if inventory item name is in the recipe ingredient name (e.g. "Chicken" in "Grilled Chicken")
-            is_found = any(inv_item in name or name in inv_item for inv_item in inventory_set)
-            
-            if not is_found:
-                return False, name
-                
-        return True, None
+        matcher = available if isinstance(available, IngredientMatcher) else IngredientMatcher(available)
+        bad_ing = matcher.first_missing(recipe.get("ingredients", []))
+        return bad_ing is None, bad_ing
 
     async def _get_user_context(self, user_id: int, db: Session):
         """Helper to get allergens and inventory DIRECTLY from database to avoid stale data"""
@@ -171,10 +763,117 @@ class RecipeService:
     ) -> List[Dict]:
         """
         Use Gemini to generate full recipe JSONs based on ingredients.
+        Collects the whole stream; the suggestion pipeline consumes it recipe by recipe instead.
         """
-        if not self.model:
-            return []
+        return [
+            recipe async for recipe in self._stream_recipes_with_gemini(
+                ingredients, dietary_restrictions, count, forbidden_override
+            )
+        ]
+
+    async def _stream_recipes_with_gemini(
+            self,
+            ingredients: List[str],
+            dietary_restrictions: List[str],
+            count: int,
+            forbidden_override: Optional[List[str]] = None,
+            matcher: Optional[IngredientMatcher] = None,
+            forbidden_sink: Optional[set] = None,
+            needed: Optional[int] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream recipes from Gemini, yielding each one as soon as its JSON object is complete.
+        Malformed objects are dropped individually; errors end the stream quietly.
+
+        With a matcher, ingredients are checked as they are parsed, and the offending names
+        are added to forbidden_sink for the re-issue. A recipe that uses a forbidden ingredient
+        is skipped (never validated or yielded) while the recipes after it are still read.
+        Once no later recipe can help - the doomed one is the last requested, or the rest can
+        no longer make up the `needed` (default: count) recipes - the call is aborted so the
+        caller can re-issue it with those names forbidden.
+        """
+        if not self.llm.available:
+            return
+
+        prompt = self._build_recipe_prompt(ingredients, dietary_restrictions, count, forbidden_override)
+
+        doomed = {}  # recipe number -> first forbidden ingredient
+
+        def check_ingredient(ingredient: Dict) -> None:
+            name = ingredient.get("name")
+            if not isinstance(name, str) or matcher.is_available(name):
+                return
+            bad_ing = name.lower().strip()
+            if forbidden_sink is not None:
+                forbidden_sink.add(bad_ing)
+            if parser.recipes_started in doomed:
+                return
+            # Only this recipe is lost; the ones after it in the stream may still be valid
+            print(f"DEBUG: Skipping in-progress recipe, it uses '{bad_ing}'")
+            doomed[parser.recipes_started] = bad_ing
+            parser.skip_current()
+            self._record_recipe_outcome(accepted=False)
+
+        early_reject = matcher is not None and settings.RECIPE_EARLY_REJECT
+        if needed is None:
+            needed = count
+        print(f"DEBUG: Generating {count} recipes with Gemini...")
+        parser = RecipeStreamParser(on_ingredient=check_ingredient if early_reject else None)
+        generated = 0
+        aborted = False
+        try:
+            async with aclosing(self.llm.stream(prompt)) as chunks:
+                async for chunk in chunks:
+                    for r in parser.feed(chunk):
+                        recipe = self._finalize_generated_recipe(r)
+                        if recipe is None:
+                            parser.dropped += 1
+                            continue
+                        generated += 1
+                        yield recipe
 
+                    bad_ing = doomed.get(parser.recipes_started)
+                    if parser.recipe_in_progress and bad_ing:
+                        not_started = count - parser.recipes_started
+                        if not_started <= 0 or generated + not_started < needed:
+                            # Nothing left in this call can make up the shortfall: stop paying for it
+                            print(f"DEBUG: Aborting generation, in-progress recipe uses '{bad_ing}' "
+                                  f"and the rest of the call can't cover {needed} recipes")
+                            aborted = True
+                            break
+            if not aborted:
+                parser.close()
+        except Exception as e:
+            print(f"Error generating recipes with Gemini: {e}")
+        finally:
+            print(f"DEBUG: Generated {generated} recipes ({parser.dropped} malformed dropped, "
+                  f"{parser.skipped} skipped for forbidden ingredients)")
+
+    def _finalize_generated_recipe(self, r: Dict) -> Optional[Dict]:
+        """Post-process one parsed recipe object; None if it is unusable."""
+        if not isinstance(r.get("name"), str) or not r["name"].strip():
+            return None
+
+        # Enrich with missing fields if needed
+        if "recipe_id" not in r or r["recipe_id"] == "generate_uuid":
+            r["recipe_id"] = str(uuid.uuid4())
+
+        # Ensure source is set
+        r["source"] = "gemini_ai"
+        r["spoonacular_url"] = None
+
+        # Images are attached later, only for recipes that pass validation
+        r["image_url"] = None
+        return r
+
+    def _build_recipe_prompt(
+            self,
+            ingredients: List[str],
+            dietary_restrictions: List[str],
+            count: int,
+            forbidden_override: Optional[List[str]] = None
+    ) -> str:
+        """Strict-JSON prompt demanding absolute inventory compliance."""
         # Logic for strict ingredient list
         if not ingredients:
             ing_str = "USER HAS NO FRESH INGREDIENTS."
@@ -197,7 +896,7 @@ class RecipeService:
         diet_str = ", ".join(dietary_restrictions) if dietary_restrictions else "None"
 
         # Use prompt for strict JSON and absolute inventory compliance
-        prompt = f"""
+        return f"""
 You are a highly logical and creative chef AI. Your ABSOLUTE mission is to create {count} unique dinner recipes based ONLY on the user's available inventory.
 
 USER INVENTORY: {ing_str}
@@ -230,46 +929,6 @@ JSON Structure:
     ]
 }}
 """
-        print(f"DEBUG: Generating {count} recipes with Gemini...")
-        try:
-            # Using asyncio.to_thread since generate_content is blocking
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
-            completion = response.text
-            
-            # Clean up potential markdown code blocks
-            clean_json = completion.replace("```json", "").replace("```", "").strip()
-            
-            import json
-            import uuid
-            
-            data = json.loads(clean_json)
-            
-            # Post-process to ensure valid format
-            final_recipes = []
-            if isinstance(data, list):
-                for r in data:
-                    # Enrich with missing fields if needed
-                    if "recipe_id" not in r or r["recipe_id"] == "generate_uuid":
-                        r["recipe_id"] = str(uuid.uuid4())
-                    
-                    # Ensure source is set
-                    r["source"] = "gemini_ai"
-                    r["spoonacular_url"] = None
-                    
-                    # Use search keywords if provided, else fallback to name
-                    search_query = r.get("image_search_keywords") or r["name"]
-                    r["image_url"] = await asyncio.to_thread(
-                        generate_recipe_image_url, search_query
-                    )
-                    
-                    final_recipes.append(r)
-            
-            print(f"DEBUG: Generated {len(final_recipes)} recipes")
-            return final_recipes
-
-        except Exception as e:
-            print(f"Error generating recipes with Gemini: {e}")
-            return []
 
 
 # Singleton instance
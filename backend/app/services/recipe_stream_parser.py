@@ -0,0 +1,163 @@
+"""
+Recipe Stream Parser - Incremental JSON extraction for streamed Gemini output
+
+Gemini returns recipes as a JSON array, sometimes wrapped in markdown fences
+or prose. Instead of waiting for the full response and json.loads-ing it, the
+parser is fed text chunks as they arrive and returns each top-level recipe
+object as soon as its closing brace is seen.
+
+Each object is decoded on its own, so a malformed or truncated object is
+dropped without losing the recipes around it.
+
+An optional on_ingredient callback receives each entry of the in-progress
+recipe's "ingredients" array as soon as it is complete, before the recipe
+itself is finished - enough to spot a forbidden ingredient early. The caller
+can then skip_current() to discard that recipe while the rest of the stream
+is still parsed.
+"""
+
+import json
+from typing import Callable, Dict, List, Optional
+
+
+class RecipeStreamParser:
+    """Feed it chunks of a (possibly fenced) JSON array; get back completed objects"""
+
+    def __init__(self, on_ingredient: Optional[Callable[[Dict], None]] = None):
+        # Open containers ('[' / '{') from the outermost inwards
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        # Characters of the recipe object currently being captured
+        self._capture: List[str] = []
+        self._capture_depth = None
+        self.dropped = 0
+        self.skipped = 0
+        self._skip_capture = False
+        # Number of recipe objects started so far (identifies the in-progress one)
+        self.recipes_started = 0
+
+        # Ingredient tracking inside the in-progress recipe
+        self._on_ingredient = on_ingredient
+        self._key_chars: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        self._in_ingredients = False
+        self._ingredient: Optional[List[str]] = None
+
+    @property
+    def recipe_in_progress(self) -> bool:
+        return self._capture_depth is not None
+
+    def skip_current(self) -> None:
+        """Discard the in-progress recipe once it closes instead of returning it"""
+        if self._capture_depth is not None:
+            self._skip_capture = True
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk of text and return every recipe object completed by it"""
+        completed = []
+        for char in chunk:
+            if self._capture_depth is not None:
+                self._capture.append(char)
+            if self._ingredient is not None:
+                self._ingredient.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_chars is not None:
+                        self._last_key = "".join(self._key_chars)
+                        self._key_chars = None
+                    continue
+                if self._key_chars is not None:
+                    self._key_chars.append(char)
+                continue
+
+            if char == '"':
+                # Quotes only matter inside JSON; prose/fences around the array are ignored
+                if self._stack:
+                    self._in_string = True
+                    if self._at_recipe_field_level():
+                        self._key_chars = []
+            elif char in "[{":
+                if char == "{" and self._capture_depth is None and self._is_recipe_level():
+                    self._capture = [char]
+                    self._capture_depth = len(self._stack)
+                    self.recipes_started += 1
+                    self._last_key = None
+                elif char == "[" and self._at_recipe_field_level():
+                    self._in_ingredients = self._last_key == "ingredients"
+                elif char == "{" and self._in_ingredients and self._at_ingredient_level():
+                    self._ingredient = [char]
+                self._stack.append(char)
+            elif char in "]}":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if self._ingredient is not None and self._at_ingredient_level():
+                    self._finish_ingredient()
+                if self._capture_depth is not None and len(self._stack) == self._capture_depth + 1 and char == "]":
+                    self._in_ingredients = False
+                if self._capture_depth is not None and len(self._stack) == self._capture_depth:
+                    self._finish_capture(completed)
+
+        return completed
+
+    def close(self) -> List[Dict]:
+        """End of stream: anything still open was truncated and is dropped"""
+        if self._capture_depth is not None and not self._skip_capture:
+            self.dropped += 1
+        self._skip_capture = False
+        self._capture = []
+        self._capture_depth = None
+        self._ingredient = None
+        self._in_ingredients = False
+        return []
+
+    def _is_recipe_level(self) -> bool:
+        # A bare top-level object, or a direct element of the top-level array
+        return not self._stack or self._stack == ["["]
+
+    def _at_recipe_field_level(self) -> bool:
+        # Directly inside the recipe object being captured (keys and field values)
+        return self._capture_depth is not None and len(self._stack) == self._capture_depth + 1
+
+    def _at_ingredient_level(self) -> bool:
+        # Directly inside the recipe's "ingredients" array
+        return self._capture_depth is not None and len(self._stack) == self._capture_depth + 2
+
+    def _finish_ingredient(self) -> None:
+        text = "".join(self._ingredient)
+        self._ingredient = None
+        if self._on_ingredient is None:
+            return
+        try:
+            ingredient = json.loads(text)
+        except ValueError:
+            return
+        if isinstance(ingredient, dict):
+            self._on_ingredient(ingredient)
+
+    def _finish_capture(self, completed: List[Dict]) -> None:
+        text = "".join(self._capture)
+        self._capture = []
+        self._capture_depth = None
+        self._in_ingredients = False
+        self._ingredient = None
+        if self._skip_capture:
+            self._skip_capture = False
+            self.skipped += 1
+            return
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            self.dropped += 1
+            return
+        if isinstance(obj, dict):
+            completed.append(obj)
+        else:
+            self.dropped += 1
@@ -0,0 +1,256 @@
+"""
+Scheduler - Background jobs started from the FastAPI lifespan
+
+- precompute_daily_suggestions: off-peak, generates suggestions for every
+  user into the persisted suggestion store so /daily-suggestion and
+  /suggestions are served from the DB instead of a live Gemini call.
+- send_daily_recipe_notifications: 5 PM fan-out of tonight's suggestion to
+  every user, in batches with bounded concurrency and a start-rate limit.
+  Progress is recorded per user in notification_job_users, so a crashed or
+  restarted run resumes with the users it hadn't reached. Users are claimed
+  a batch at a time before sending, so concurrent schedulers (several app
+  workers) never notify the same user twice.
+
+APScheduler is optional: without it the app runs normally and every
+request falls back to live generation.
+"""
+
+import asyncio
+import time
+from datetime import date, datetime
+from typing import Optional
+
+from ..config import settings
+from ..db import SessionLocal
+from ..crud import pantry as crud
+from ..crud import notification as notification_crud
+from .recipe_service import recipe_service
+from .notifications import send_push_notification
+from .rate_limiter import TokenBucket
+
+try:
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+except ImportError:
+    AsyncIOScheduler = None
+
+
+async def precompute_daily_suggestions() -> dict:
+    """Generate and store suggestions for all users (bounded concurrency + global rate limit)"""
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        user_ids = crud.get_all_user_ids(db)
+    finally:
+        db.close()
+
+    print(f"Precompute: generating suggestions for {len(user_ids)} users")
+    semaphore = asyncio.Semaphore(max(1, settings.SUGGESTION_PRECOMPUTE_CONCURRENCY))
+    pacer = TokenBucket("precompute", settings.SUGGESTION_PRECOMPUTE_RATE_PER_SECOND)
+
+    async def precompute_user(user_id: int) -> bool:
+        async with semaphore:
+            await pacer.acquire()
+            user_db = SessionLocal()
+            try:
+                return await recipe_service.precompute_suggestions(
+                    user_id, user_db, count=settings.SUGGESTION_PRECOMPUTE_COUNT
+                )
+            finally:
+                user_db.close()
+
+    results = await asyncio.gather(*(precompute_user(u) for u in user_ids), return_exceptions=True)
+
+    summary = {
+        "users": len(user_ids),
+        "generated": sum(1 for r in results if r is True),
+        "already_fresh": sum(1 for r in results if r is False),
+        "failed": sum(1 for r in results if isinstance(r, Exception)),
+        "seconds": round(time.monotonic() - started, 1),
+    }
+    for user_id, result in zip(user_ids, results):
+        if isinstance(result, Exception):
+            print(f"Precompute: user {user_id} failed: {result}")
+    print(f"Precompute: done {summary}")
+    return summary
+
+
+def _notification_run_key(day: Optional[date] = None) -> str:
+    return f"daily_dinner:{(day or date.today()).isoformat()}"
+
+
+async def send_daily_recipe_notifications() -> dict:
+    """
+    Send tonight's suggestion to every user in this worker's shard.
+    Resumable: re-running on the same day only processes users not yet notified.
+    """
+    started = time.monotonic()
+    run_key = _notification_run_key()
+    shard_count = max(1, settings.NOTIFICATION_SHARD_COUNT)
+    shard = settings.NOTIFICATION_SHARD_INDEX % shard_count
+    max_attempts = max(1, settings.NOTIFICATION_MAX_ATTEMPTS)
+
+    db = SessionLocal()
+    try:
+        job = notification_crud.get_or_create_job(db, run_key)
+        notification_crud.enqueue_job_users(db, job, crud.get_all_user_ids(db), shard_count)
+        job_id = job.id
+    finally:
+        db.close()
+
+    semaphore = asyncio.Semaphore(max(1, settings.NOTIFICATION_CONCURRENCY))
+    pacer = TokenBucket("notifications", settings.NOTIFICATION_RATE_PER_SECOND)
+
+    async def notify_user(user_id: int) -> bool:
+        async with semaphore:
+            await pacer.acquire()
+            user_started = time.monotonic()
+            user_db = SessionLocal()
+            try:
+                recipe = None
+                try:
+                    recipe = await recipe_service.get_daily_suggestion(user_id, user_db)
+                    if "error" in recipe:
+                        raise RuntimeError(recipe["error"])
+                    await send_push_notification(
+                        user_id=user_id,
+                        title="What's for dinner?",
+                        body=f"Try {recipe['name']} tonight! Ready in {recipe['ready_in_minutes']} min.",
+                        data={"recipe": recipe}
+                    )
+                    sent, error = True, None
+                except Exception as e:
+                    sent, error = False, str(e)
+
+                notification_crud.record_job_user_result(
+                    user_db, job_id, user_id, sent,
+                    latency_ms=(time.monotonic() - user_started) * 1000,
+                    recipe_id=recipe.get("recipe_id") if sent else None,
+                    error=error
+                )
+                return sent
+            finally:
+                user_db.close()
+
+    def claim_batch(pass_started: datetime) -> list:
+        claim_db = SessionLocal()
+        try:
+            return notification_crud.claim_pending_users(
+                claim_db, job_id, shard, max_attempts,
+                limit=batch_size,
+                lease_seconds=settings.NOTIFICATION_CLAIM_LEASE_SECONDS,
+                claimed_before=pass_started
+            )
+        finally:
+            claim_db.close()
+
+    def unsent_count() -> int:
+        count_db = SessionLocal()
+        try:
+            return notification_crud.count_unsent_users(count_db, job_id, shard, max_attempts)
+        finally:
+            count_db.close()
+
+    # Batches bound how many user tasks exist at once; concurrency inside a batch is the semaphore.
+    # Each batch is claimed just before it's sent, so another scheduler running the same shard
+    # takes different users. Later passes retry failed users until they run out of attempts.
+    batch_size = max(1, settings.NOTIFICATION_BATCH_SIZE)
+    users = set()
+    sent_count = 0
+    for attempt in range(max_attempts):
+        if attempt:
+            if not unsent_count():
+                break
+            await asyncio.sleep(settings.NOTIFICATION_RETRY_DELAY_SECONDS)
+        pass_started = datetime.now()
+        processed = 0
+        while True:
+            batch = claim_batch(pass_started)
+            if not batch:
+                break
+            users.update(batch)
+            results = await asyncio.gather(*(notify_user(u) for u in batch), return_exceptions=True)
+            sent_count += sum(1 for r in results if r is True)
+            processed += len(batch)
+            print(f"Notifications: {run_key} shard {shard}/{shard_count} pass {attempt + 1}, "
+                  f"{processed} users processed")
+        if not processed:
+            break
+
+    db = SessionLocal()
+    try:
+        job = notification_crud.finish_job(db, job_id, max_attempts)
+        status = job.status if job else "unknown"
+    finally:
+        db.close()
+
+    summary = {
+        "run_key": run_key,
+        "shard": shard,
+        "users": len(users),
+        "sent": sent_count,
+        "failed": len(users) - sent_count,
+        "job_status": status,
+        "seconds": round(time.monotonic() - started, 1),
+    }
+    print(f"Notifications: done {summary}")
+    return summary
+
+
+def _has_unfinished_notification_run() -> bool:
+    """True if today's fan-out started but didn't complete (e.g. the process crashed mid-run)"""
+    db = SessionLocal()
+    try:
+        job = notification_crud.get_job(db, _notification_run_key())
+        return job is not None and job.status != "completed"
+    except Exception as e:
+        print(f"Error checking notification jobs: {e}")
+        return False
+    finally:
+        db.close()
+
+
+_scheduler: Optional["AsyncIOScheduler"] = None
+
+
+def start_scheduler() -> None:
+    """Start background jobs (call from the app lifespan, inside the running event loop)"""
+    global _scheduler
+    if _scheduler is not None:
+        return
+    if AsyncIOScheduler is None:
+        print("WARNING: apscheduler not installed. Suggestions will not be precomputed.")
+        return
+
+    _scheduler = AsyncIOScheduler()
+    if settings.SUGGESTION_PRECOMPUTE_ENABLED:
+        _scheduler.add_job(
+            precompute_daily_suggestions,
+            "cron",
+            hour=settings.SUGGESTION_PRECOMPUTE_HOUR,
+            minute=settings.SUGGESTION_PRECOMPUTE_MINUTE,
+            id="precompute_daily_suggestions",
+            max_instances=1,
+            coalesce=True,
+        )
+    if settings.NOTIFICATION_ENABLED:
+        _scheduler.add_job(
+            send_daily_recipe_notifications,
+            "cron",
+            hour=settings.NOTIFICATION_HOUR,
+            minute=settings.NOTIFICATION_MINUTE,
+            id="send_daily_recipe_notifications",
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=settings.NOTIFICATION_MISFIRE_GRACE_SECONDS,
+        )
+        if _has_unfinished_notification_run():
+            print("Notifications: resuming today's unfinished run")
+            _scheduler.add_job(send_daily_recipe_notifications, id="resume_daily_recipe_notifications")
+    _scheduler.start()
+
+
+def shutdown_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown(wait=False)
+        _scheduler = None
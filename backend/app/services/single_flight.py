@@ -0,0 +1,47 @@
+"""
+Single Flight - Coalesce concurrent identical async calls
+
+While a call for a key is in flight, later callers with the same key await
+the same task instead of starting their own. The work is shielded, so one
+caller disconnecting doesn't cancel it for the others (and its result still
+lands in whatever cache the work writes to).
+
+Callers share one result object - copy it before mutating.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """In-process request coalescing keyed by an arbitrary hashable"""
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._started = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or join the call already running for it"""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            self._started += 1
+
+            def forget(done: asyncio.Task, key=key) -> None:
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+
+            task.add_done_callback(forget)
+        else:
+            self._coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "started": self._started,
+            "coalesced": self._coalesced,
+        }
@@ -0,0 +1,103 @@
+"""
+Suggestion Cache - In-process TTL + LRU cache for recipe suggestions
+
+Recipe suggestions only depend on what the user has in stock, their allergens
+and how many recipes were asked for. Users reopen the app several times before
+dinner with an unchanged pantry, so we key results on a stable fingerprint of
+those inputs and skip the Gemini + image pipeline on a hit.
+
+Entries are dropped explicitly by the pantry CRUD layer whenever a user's
+inventory or preferences change.
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from ..config import settings
+
+
+def inventory_fingerprint(ingredients: Iterable[str], allergens: Iterable[str]) -> str:
+    """Stable hash of a user's available ingredient set and resolved allergens (order-insensitive)."""
+    normalized_ingredients = sorted({i.lower().strip() for i in ingredients if i and i.strip()})
+    normalized_allergens = sorted({a.lower().strip() for a in allergens if a and a.strip()})
+    payload = "\n".join(normalized_ingredients) + "\x00" + "\n".join(normalized_allergens)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SuggestionCache:
+    """Thread-safe TTL + LRU cache of suggestion lists, indexed by user for invalidation"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, int, List[Dict]]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[str]] = {}
+        # Pantry routes are sync and run in the threadpool, so guard with a real lock
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(user_id: int, fingerprint: str, count: int) -> str:
+        # Scoped per user so recipe ids are never shared between accounts
+        return f"{user_id}:{fingerprint}:{count}"
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return a copy of the cached recipes, or None on miss/expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, user_id, recipes = entry
+            if expires_at <= time.monotonic():
+                self._remove(key, user_id)
+                return None
+
+            self._entries.move_to_end(key)
+            return copy.deepcopy(recipes)
+
+    def set(self, key: str, user_id: int, recipes: List[Dict]) -> None:
+        """Store a copy of the recipes, evicting least recently used entries past max_entries"""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, self._entries[key][1])
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, user_id, copy.deepcopy(recipes))
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest_key, (_, oldest_user, _) = next(iter(self._entries.items()))
+                self._remove(oldest_key, oldest_user)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached suggestion for a user (inventory or preferences changed)"""
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop everything (e.g. a shared pantry item was renamed or deleted)"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key: str, user_id: int) -> None:
+        self._entries.pop(key, None)
+        user_keys = self._keys_by_user.get(user_id)
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[user_id]
+
+
+# Singleton instance
+suggestion_cache = SuggestionCache(
+    ttl_seconds=settings.SUGGESTION_CACHE_TTL_SECONDS,
+    max_entries=settings.SUGGESTION_CACHE_MAX_ENTRIES,
+)
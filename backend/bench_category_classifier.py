@@ -0,0 +1,111 @@
+"""
+Microbenchmark: guessing pantry categories for a product catalog.
+
+Generates synthetic Open Food Facts category strings (comma-separated chains
+built from real-looking terms, with the repetition a real catalog has, plus
+adversarial strings where keywords overlap across rules) and classifies them with:
+- legacy:     the original chain of any(word in categories ...) checks
+- table:      CategoryClassifier, one product at a time without its cache
+- cached:     CategoryClassifier.classify (per-string LRU cache)
+- batch:      CategoryClassifier.classify_many (each distinct string once)
+checking all of them agree with the legacy rules on every product.
+
+Usage (from backend/):
+  python bench_category_classifier.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# Add the current directory to sys.path so we can import app modules
+sys.path.append(os.getcwd())
+
+from app.schemas.pantry import Category
+from app.services.category_classifier import CategoryClassifier, CATEGORY_RULES
+
+TERMS = [
+    "Plant-based foods and beverages", "Plant-based foods", "Snacks", "Sweet snacks", "Biscuits and cakes",
+    "Dairies", "Fermented foods", "Cheeses", "Cow cheeses", "Beverages", "Carbonated drinks", "Sodas",
+    "Meats", "Prepared meats", "Hams", "Groceries", "Sauces", "Tomato sauces", "Cereals and potatoes",
+    "Breads", "Sugary snacks", "Confectioneries", "Candies", "Frozen foods", "Frozen desserts",
+    "Ice creams", "Canned foods", "Canned vegetables", "Fruit juices", "Spreads", "Breakfasts",
+    "Condiments", "Herbs", "Seafood", "Fishes", "Yogurts", "Pastas", "Rices", "Chips and fries",
+    "Olive oils", "Chocolates", "Teas", "Coffees", "Nuts", "Legumes",
+]
+
+
+def legacy_guess_category(product):
+    """BarcodeService._guess_category before the precompiled classifier"""
+    categories = product.get("categories", "").lower()
+
+    if any(word in categories for word in ["meat", "chicken", "beef", "pork", "fish", "seafood"]):
+        return Category.PROTEIN
+    elif any(word in categories for word in ["pasta", "rice", "bread", "cereal", "grain"]):
+        return Category.GRAIN
+    elif any(word in categories for word in ["vegetable", "veggie"]):
+        return Category.VEGETABLE
+    elif any(word in categories for word in ["fruit", "apple", "banana", "orange"]):
+        return Category.FRUIT
+    elif any(word in categories for word in ["milk", "cheese", "yogurt", "dairy"]):
+        return Category.DAIRY
+    elif any(word in categories for word in ["sauce", "condiment", "dressing", "ketchup"]):
+        return Category.CONDIMENT
+    elif any(word in categories for word in ["spice", "seasoning", "herb"]):
+        return Category.SPICE
+    elif any(word in categories for word in ["canned", "can"]):
+        return Category.CANNED
+    elif any(word in categories for word in ["frozen"]):
+        return Category.FROZEN
+    elif any(word in categories for word in ["snack", "chip", "cookie", "candy"]):
+        return Category.SNACK
+    elif any(word in categories for word in ["beverage", "drink", "juice", "soda"]):
+        return Category.BEVERAGE
+
+    return Category.OTHER
+
+
+def make_catalog(size, distinct, rng):
+    chains = [", ".join(rng.sample(TERMS, rng.randint(0, 6))) for _ in range(distinct)]
+    # Keywords glued together so that one overlaps the next across rules
+    keywords = [keyword for _, words in CATEGORY_RULES for keyword in words]
+    chains += ["".join(rng.sample(keywords, 2)) for _ in range(distinct // 10)]
+    chains += ["cheeseafood", "ketchupasta", "herbanana", "sodairy", "candyogurt", ""]
+    # A few chains are far more common than the rest, as in a real catalog
+    weights = [1.0 / (rank + 1) for rank in range(len(chains))]
+    return [{"categories": text} for text in rng.choices(chains, weights=weights, k=size)]
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'products':>9} | {'legacy (ms)':>11} | {'table (ms)':>10} | {'cached (ms)':>11} | {'batch (ms)':>10}")
+    print("-" * 65)
+
+    for size in (10_000, 100_000):
+        catalog = make_catalog(size, distinct=size // 10, rng=rng)
+        expected = [legacy_guess_category(product) for product in catalog]
+
+        classifier = CategoryClassifier()
+        uncached = [classifier._classify_text(product["categories"]) for product in catalog]
+        assert uncached == expected, "table disagrees with the legacy rules"
+        assert [classifier.classify(product) for product in catalog] == expected, "cached disagrees"
+        assert classifier.classify_many(catalog) == expected, "batch disagrees"
+
+        def run_cached():
+            # A fresh classifier each run, so the cache starts cold
+            fresh = CategoryClassifier()
+            return [fresh.classify(product) for product in catalog]
+
+        legacy_ms = min(timeit.repeat(lambda: [legacy_guess_category(p) for p in catalog], number=1, repeat=3)) * 1000
+        table_ms = min(timeit.repeat(
+            lambda: [classifier._classify_text(p["categories"]) for p in catalog], number=1, repeat=3
+        )) * 1000
+        cached_ms = min(timeit.repeat(run_cached, number=1, repeat=3)) * 1000
+        batch_ms = min(timeit.repeat(lambda: classifier.classify_many(catalog), number=1, repeat=3)) * 1000
+
+        print(f"{size:>9} | {legacy_ms:>11.2f} | {table_ms:>10.2f} | {cached_ms:>11.2f} | {batch_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
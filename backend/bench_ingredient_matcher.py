@@ -0,0 +1,112 @@
+"""
+Microbenchmark: IngredientMatcher vs. the original substring scan in _is_recipe_valid.
+
+Simulates one /suggestions request (5 attempts x 4 recipes x 8 ingredients)
+against inventories of 10, 100 and 1000 items, and checks both implementations
+agree on every recipe.
+
+Usage (from backend/):
+  python bench_ingredient_matcher.py
+"""
+
+import random
+import sys
+import os
+import timeit
+
+# Add the current directory to sys.path so we can import app modules
+sys.path.append(os.getcwd())
+
+from app.services.ingredient_matcher import IngredientMatcher
+
+ADJECTIVES = ["fresh", "frozen", "organic", "smoked", "roasted", "dried", "sweet", "baby", "whole", "ground",
+              "large", "red", "green", "yellow", "wild", "aged", "low fat", "unsalted", "spicy", "light"]
+NOUNS = ["chicken", "beef", "pork", "salmon", "tuna", "rice", "pasta", "spinach", "broccoli", "carrots",
+         "onions", "garlic", "tomatoes", "potatoes", "peppers", "mushrooms", "beans", "lentils", "tofu", "eggs",
+         "milk", "cheddar", "yogurt", "butter", "flour", "oats", "quinoa", "corn", "peas", "zucchini",
+         "basil", "cilantro", "ginger", "lemons", "limes", "apples", "bananas", "honey", "vinegar", "olive oil"]
+HALLUCINATIONS = ["saffron", "truffle oil", "caviar", "lobster", "creme fraiche", "pine nuts", "duck breast"]
+
+ATTEMPTS = 5
+RECIPES_PER_ATTEMPT = 4
+INGREDIENTS_PER_RECIPE = 8
+
+
+def legacy_is_recipe_valid(recipe, available):
+    """The pre-IngredientMatcher implementation, kept verbatim for comparison"""
+    inventory_set = {i.lower().strip() for i in available}
+    staples = {"water", "salt"}
+
+    for ing in recipe.get("ingredients", []):
+        name = ing.get("name", "").lower().strip()
+        if not name: continue
+        if name in staples:
+            continue
+        is_found = any(inv_item in name or name in inv_item for inv_item in inventory_set)
+        if not is_found:
+            return False, name
+
+    return True, None
+
+
+def matcher_is_recipe_valid(recipe, matcher):
+    bad_ing = matcher.first_missing(recipe.get("ingredients", []))
+    return bad_ing is None, bad_ing
+
+
+def make_inventory(size, rng):
+    names = set()
+    while len(names) < size:
+        names.add(f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {len(names)}" if size > 200
+                  else f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}")
+    return sorted(names)
+
+
+def make_recipes(inventory, rng):
+    recipes = []
+    for _ in range(ATTEMPTS * RECIPES_PER_ATTEMPT):
+        ingredients = []
+        for _ in range(INGREDIENTS_PER_RECIPE):
+            roll = rng.random()
+            if roll < 0.05:
+                name = rng.choice(HALLUCINATIONS)
+            elif roll < 0.15:
+                name = rng.choice(["salt", "water"])
+            else:
+                # LLMs usually echo a shortened form of the inventory name
+                name = rng.choice(inventory).split(" ", 1)[-1]
+            ingredients.append({"name": name.title(), "amount": 1, "unit": "cup"})
+        recipes.append({"name": "Recipe", "ingredients": ingredients})
+    return recipes
+
+
+def run_legacy(recipes, inventory):
+    return [legacy_is_recipe_valid(r, inventory) for r in recipes]
+
+
+def run_matcher(recipes, inventory):
+    # Built once per request, reused across all attempts and recipes
+    matcher = IngredientMatcher(inventory)
+    return [matcher_is_recipe_valid(r, matcher) for r in recipes]
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'items':>6} | {'legacy (ms)':>12} | {'matcher (ms)':>12} | {'speedup':>8}")
+    print("-" * 48)
+
+    for size in (10, 100, 1000):
+        inventory = make_inventory(size, rng)
+        recipes = make_recipes(inventory, rng)
+
+        assert run_legacy(recipes, inventory) == run_matcher(recipes, inventory), "implementations disagree"
+
+        repeat = 200 if size < 1000 else 20
+        legacy = min(timeit.repeat(lambda: run_legacy(recipes, inventory), number=repeat, repeat=3)) / repeat
+        matcher = min(timeit.repeat(lambda: run_matcher(recipes, inventory), number=repeat, repeat=3)) / repeat
+
+        print(f"{size:>6} | {legacy * 1000:>12.3f} | {matcher * 1000:>12.3f} | {legacy / matcher:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Microbenchmark: ranking a recipe corpus against one pantry with PantryBitsetIndex.
+
+Builds synthetic corpora (10k / 50k recipes, 2000-ingredient vocabulary, Zipf-ish
+ingredient popularity) and ranks them against a 40-item pantry with:
+- sets:   per-recipe set.issubset (the obvious Python loop)
+- ints:   PantryBitsetIndex without NumPy (one Python int per recipe)
+- numpy:  PantryBitsetIndex with NumPy (one vectorized pass), if installed
+checking all of them return the same ranking.
+
+Usage (from backend/):
+  python bench_pantry_bitset.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# Add the current directory to sys.path so we can import app modules
+sys.path.append(os.getcwd())
+
+from app.services import pantry_bitset
+from app.services.pantry_bitset import PantryBitsetIndex
+
+VOCABULARY_SIZE = 2000
+PANTRY_SIZE = 40
+
+
+def make_corpus(size, rng):
+    vocabulary = [f"ingredient {i}" for i in range(VOCABULARY_SIZE)]
+    # Popular ingredients show up in far more recipes than rare ones
+    weights = [1.0 / (rank + 1) for rank in range(VOCABULARY_SIZE)]
+    recipes = []
+    for recipe_id in range(size):
+        ingredients = set(rng.choices(vocabulary, weights=weights, k=rng.randint(2, 10)))
+        recipes.append((recipe_id, sorted(ingredients)))
+    ready = [rng.randint(5, 90) for _ in range(size)]
+    return vocabulary, recipes, ready
+
+
+def rank_with_sets(recipes, ready, pantry):
+    pantry = set(pantry)
+    feasible = [
+        (recipe_id, len(ingredients), ready[row], row)
+        for row, (recipe_id, ingredients) in enumerate(recipes)
+        if pantry.issuperset(ingredients)
+    ]
+    feasible.sort(key=lambda item: (-item[1], item[2], item[3]))
+    return [(recipe_id, coverage) for recipe_id, coverage, _, _ in feasible]
+
+
+def main():
+    rng = random.Random(42)
+    numpy_module = pantry_bitset.np
+    print(f"{'recipes':>8} | {'sets (ms)':>10} | {'ints (ms)':>10} | {'numpy (ms)':>10} | {'feasible':>8}")
+    print("-" * 60)
+
+    for size in (10_000, 50_000):
+        vocabulary, recipes, ready = make_corpus(size, rng)
+        pantry = vocabulary[:PANTRY_SIZE // 2] + rng.sample(vocabulary, PANTRY_SIZE // 2)
+        expected = rank_with_sets(recipes, ready, pantry)
+
+        pantry_bitset.np = None
+        ints_index = PantryBitsetIndex(recipes, tiebreak=ready)
+        assert ints_index.rank(pantry) == expected, "int bitsets disagree"
+
+        numpy_ms = float("nan")
+        if numpy_module is not None:
+            pantry_bitset.np = numpy_module
+            numpy_index = PantryBitsetIndex(recipes, tiebreak=ready)
+            assert numpy_index.rank(pantry) == expected, "numpy bitsets disagree"
+            numpy_ms = min(timeit.repeat(lambda: numpy_index.rank(pantry), number=20, repeat=3)) / 20 * 1000
+        else:
+            print("(numpy not installed - skipping the vectorized path)")
+
+        sets_ms = min(timeit.repeat(lambda: rank_with_sets(recipes, ready, pantry), number=5, repeat=3)) / 5 * 1000
+        ints_ms = min(timeit.repeat(lambda: ints_index.rank(pantry), number=5, repeat=3)) / 5 * 1000
+
+        print(f"{size:>8} | {sets_ms:>10.2f} | {ints_ms:>10.2f} | {numpy_ms:>10.2f} | {len(expected):>8}")
+
+    pantry_bitset.np = numpy_module
+
+
+if __name__ == "__main__":
+    main()
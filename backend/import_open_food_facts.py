@@ -0,0 +1,288 @@
+"""
+Import an Open Food Facts bulk export into pantry_items, so scans hit the local DB.
+
+Usage (from backend/):
+    python import_open_food_facts.py openfoodfacts-products.jsonl.gz [--batch-size 5000] [--resume] [--update]
+    python import_open_food_facts.py en.openfoodfacts.org.products.csv.gz
+
+Accepts the JSONL export (one product per line) or the CSV export (tab-separated),
+gzipped or not. The file is streamed, so memory stays flat for millions of products.
+Each product goes through the same parsing as a live scan (BarcodeService) and is
+inserted by barcode in batched transactions. Barcodes already in pantry_items are
+left alone unless --update is given (that overwrites hand-edited items too).
+
+Progress is checkpointed after every batch (<file>.checkpoint); --resume continues
+after the rows already imported by an interrupted run. Uncompressed files resume
+by seeking to the saved byte offset; gzipped ones have to be re-read up to it, but
+the skipped rows are not parsed.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from itertools import chain
+
+from pydantic import ValidationError
+from sqlalchemy import func
+
+# Add the current directory to sys.path so we can import app modules
+sys.path.append(os.getcwd())
+
+from app.db import SessionLocal, engine, Base
+from app.models.pantry import PantryItem
+from app.services.barcode import barcode_service
+
+# CSV export columns that map to the nutriments dict of the API/JSONL shape
+NUTRIMENT_COLUMNS = ("energy-kcal_100g", "proteins_100g", "carbohydrates_100g", "fat_100g")
+
+# Max barcode length in pantry_items (PantryItemBase)
+MAX_BARCODE_LENGTH = 50
+
+
+def open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def is_csv(path):
+    return path.removesuffix(".gz").endswith((".csv", ".tsv"))
+
+
+def is_seekable(path):
+    return not path.endswith(".gz")
+
+
+def read_lines(path, offset=0):
+    """(line, byte offset after it) pairs; the offset is None for gzip, which can't seek cheaply"""
+    if not is_seekable(path):
+        with open_text(path) as f:
+            for line in f:
+                yield line, None
+        return
+    # Binary mode so positions are exact (text-mode tell() is unavailable while iterating)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            offset += len(raw)
+            yield raw.decode("utf-8"), offset
+
+
+def read_jsonl_products(path, rows_done=0, offset=None):
+    """(product or None, offset) per line, starting after rows_done lines (or at offset)"""
+    first = rows_done + 1 if offset is not None else 1
+    for line_number, (line, end) in enumerate(read_lines(path, offset or 0), start=first):
+        if line_number <= rows_done:
+            continue  # already imported: not decoded
+        line = line.strip()
+        if not line:
+            yield None, end
+            continue
+        try:
+            yield json.loads(line), end
+        except ValueError:
+            print(f"Skipping malformed line {line_number}")
+            yield None, end
+
+
+def read_csv_products(path, delimiter, rows_done=0, offset=None):
+    """(product, offset) per row, starting after rows_done rows (or at offset)"""
+    # Some export fields (ingredients, images) are far larger than csv's default limit
+    csv.field_size_limit(sys.maxsize)
+    lines = read_lines(path, offset or 0)
+    if offset is not None:
+        # Seeked past the header: read it from the start of the file
+        lines = chain([next(read_lines(path))], lines)
+
+    # csv pulls one line at a time, so after each row this is the offset of its end
+    position = [None]
+
+    def text(pairs):
+        for line, end in pairs:
+            position[0] = end
+            yield line
+
+    reader = csv.reader(text(lines), delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        return
+    if offset is None:
+        for _ in range(rows_done):
+            # Already imported: step over the record without building the row dict
+            if next(reader, None) is None:
+                return
+
+    for values in reader:
+        row = dict(zip(header, values))
+        # Rebuild the API shape so the live-scan parser can be reused as is
+        nutriments = {}
+        for column in NUTRIMENT_COLUMNS:
+            value = row.get(column)
+            if value:
+                try:
+                    nutriments[column] = float(value)
+                except ValueError:
+                    pass
+        yield {
+            "code": row.get("code"),
+            "product_name": row.get("product_name"),
+            "brands": row.get("brands"),
+            "categories": row.get("categories") or row.get("categories_en") or "",
+            "serving_size": row.get("serving_size"),
+            "nutriments": nutriments,
+        }, position[0]
+
+
+def product_to_row(product):
+    """Open Food Facts product -> pantry_items row dict, or None to skip it"""
+    if not product:
+        return None
+    barcode = str(product.get("code") or "").strip()
+    if not barcode or len(barcode) > MAX_BARCODE_LENGTH:
+        return None
+    # Unnamed products would only ever show up as "Unknown Product"
+    if not (product.get("product_name") or "").strip():
+        return None
+    try:
+        parsed = barcode_service._parse_open_food_facts_response(product, barcode)
+        return barcode_service.create_pantry_item_from_barcode(parsed).model_dump()
+    except (ValidationError, AttributeError, TypeError, ValueError):
+        return None
+
+
+def upsert_statement(update_existing):
+    """INSERT ... ON CONFLICT (barcode) for the engine's dialect (SQLite or PostgreSQL)"""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(PantryItem)
+    if not update_existing:
+        return statement.on_conflict_do_nothing(index_elements=["barcode"])
+    columns = [
+        "name", "brand", "category", "default_unit",
+        "calories_per_serving", "protein_per_serving", "carbs_per_serving", "fat_per_serving",
+        "serving_size", "serving_unit",
+    ]
+    updates = {column: statement.excluded[column] for column in columns}
+    updates["updated_at"] = func.now()
+    return statement.on_conflict_do_update(index_elements=["barcode"], set_=updates)
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import an Open Food Facts export into pantry_items")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--delimiter", default="\t", help="CSV delimiter (the export is tab-separated)")
+    parser.add_argument("--update", action="store_true",
+                        help="overwrite existing items with the dump's data (including hand-edited ones)")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or f"{args.path}.checkpoint"
+    state = {"path": os.path.abspath(args.path), "rows": 0, "offset": None,
+             "imported": 0, "existing": 0, "skipped": 0}
+    if args.resume:
+        saved = load_checkpoint(checkpoint_path)
+        if saved and saved.get("path") != state["path"]:
+            sys.exit(f"Checkpoint {checkpoint_path} belongs to {saved.get('path')}")
+        state.update(saved)
+        print(f"Resuming after row {state['rows']:,}")
+    resume_after = state["rows"]
+    # Checkpoints from gzipped files (or older runs) have no offset: skip rows instead
+    resume_offset = state["offset"] if resume_after and is_seekable(args.path) else None
+
+    Base.metadata.create_all(bind=engine)
+    statement = upsert_statement(update_existing=args.update)
+    # Without a reliable executemany rowcount (e.g. psycopg2) rows left alone can't be told apart
+    exact_counts = engine.dialect.supports_sane_multi_rowcount
+    if not exact_counts:
+        imported_label = "written or already present"
+    else:
+        imported_label = "written" if args.update else "imported"
+
+    if is_csv(args.path):
+        products = read_csv_products(args.path, args.delimiter, resume_after, resume_offset)
+    else:
+        products = read_jsonl_products(args.path, resume_after, resume_offset)
+
+    db = SessionLocal()
+    started = time.monotonic()
+    rows_this_run = 0
+    batch = {}  # barcode -> row; a barcode twice in one batch keeps the last one
+
+    def flush(rows_read, offset):
+        nonlocal batch
+        if batch:
+            # Core execute on the session's connection: the ORM bulk path has no rowcount
+            result = db.connection().execute(statement, list(batch.values()))
+            db.commit()
+            # rowcount is summed over the executemany; DO NOTHING conflicts aren't in it
+            written = result.rowcount if exact_counts and result.rowcount >= 0 else len(batch)
+            state["imported"] += written
+            state["existing"] += len(batch) - written
+            batch = {}
+        state["rows"] = rows_read
+        state["offset"] = offset
+        save_checkpoint(checkpoint_path, state)
+        elapsed = time.monotonic() - started
+        rate = rows_this_run / elapsed if elapsed else 0.0
+        print(f"rows {state['rows']:,} | {imported_label} {state['imported']:,} | "
+              f"already present {state['existing']:,} | skipped {state['skipped']:,} | {rate:,.0f} rows/s")
+
+    rows_read = resume_after
+    offset = resume_offset
+    try:
+        for product, offset in products:
+            rows_read += 1
+            rows_this_run += 1
+
+            row = product_to_row(product)
+            if row is None:
+                state["skipped"] += 1
+            else:
+                batch[row["barcode"]] = row
+
+            if rows_this_run % args.batch_size == 0:
+                flush(rows_read, offset)
+        flush(rows_read, offset)
+    except KeyboardInterrupt:
+        db.rollback()
+        print(f"Interrupted; rerun with --resume to continue after row {state['rows']:,}")
+        sys.exit(1)
+    except Exception as e:
+        db.rollback()
+        print(f"Error importing Open Food Facts dump: {e}")
+        raise
+    finally:
+        db.close()
+
+    os.remove(checkpoint_path)
+    elapsed = time.monotonic() - started
+    print(f"{imported_label.capitalize()}: {state['imported']:,} products "
+          f"({state['existing']:,} already present, {state['skipped']:,} skipped) from "
+          f"{state['rows']:,} rows in {elapsed:.1f}s ({rows_this_run / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
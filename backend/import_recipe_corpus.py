@@ -0,0 +1,61 @@
+"""
+Import a JSONL recipe dump into the local recipe corpus.
+
+Usage (from backend/):
+    python import_recipe_corpus.py recipes.jsonl [--batch-size 500]
+
+One recipe per line, either in RecipeResponse shape or Spoonacular's
+recipe-information shape. Re-importing updates recipes by id.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the current directory to sys.path so we can import app modules
+sys.path.append(os.getcwd())
+
+from app.db import SessionLocal, engine, Base
+from app.models import recipe  # noqa: F401  (registers the corpus tables)
+from app.services.recipe_corpus import import_recipes
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Skipping malformed line {line_number}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a JSONL recipe dump into the local corpus")
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    started = time.monotonic()
+    try:
+        result = import_recipes(db, read_records(args.path), batch_size=args.batch_size)
+    except Exception as e:
+        db.rollback()
+        print(f"Error importing corpus: {e}")
+        raise
+    finally:
+        db.close()
+
+    elapsed = time.monotonic() - started
+    print(f"Imported {result['imported']} recipes ({result['skipped']} skipped) in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()